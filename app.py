@@ -1,15 +1,20 @@
 import streamlit as st
 import pandas as pd
 from db_client import (
-    get_categories, add_category, update_category, delete_category,
-    add_transaction, get_transactions, delete_transaction,
-    get_month_sheet_name, get_available_months
+    apply_category_changes, diff_categories, get_categories_version,
+    get_month_sheet_name, list_transactions, refresh_categories, get_diagnostics, reset_query_stats
 )
-from utils.categorizer import categorize_expense
-from utils.charts import progress_bar, pie_chart, daily_spending
-import time
+from utils.data_loader import load_snapshot, load_month_data
+from utils.importer import import_transactions, detect_format, open_text
+from utils.exporter import start_export
+from utils import read_cache, write_behind, replica
+from utils.optimistic import get_tracker
+from utils.money import MoneyArray, allocate, cents_to_decimal, format_cents, to_cents
+from utils.records import Category
 from datetime import datetime
 
+HISTORY_PAGE_SIZE = 50
+
 # Page Config
 st.set_page_config(page_title="Budget App", layout="wide", initial_sidebar_state="expanded")
 
@@ -30,90 +35,152 @@ st.markdown("""
 # Main App
 st.sidebar.title("Budget App")
 
+# Saves and deletes are shown right away and committed in the background;
+# report the ones that failed (they have already dropped out of the page)
+writes = get_tracker(st.session_state)
+for description, error in writes.settle():
+    st.error(f"Could not {description}: {error}. The change was undone.")
+notice = st.session_state.pop('notice', None)
+if notice:
+    st.toast(notice)
+
+if writes.in_flight():
+    @st.fragment(run_every=0.5)
+    def await_writes():
+        # Rerun the page once the background writes land, to show the saved rows (or the error)
+        if not writes.in_flight():
+            st.rerun()
+    await_writes()
+
+# Start every query this page needs at once. The page and month picked on the
+# previous rerun are used as a guess so month data can load alongside the rest.
+guessed_page = st.session_state.get("nav_page", "Dashboard")
+guessed_month = st.session_state.get("selected_month") or get_month_sheet_name()
+snapshot = load_snapshot(
+    guessed_month,
+    include_month_data=(guessed_page == "Dashboard"),
+    writes=writes
+)
+
 # Month selector
-try:
-    available_months = get_available_months()
-    if not available_months:
-        available_months = [get_month_sheet_name()]
-    selected_month = st.sidebar.selectbox("Select Month", available_months, index=0)
-except Exception as e:
-    st.error(f"Error connecting to Database: {e}")
+if 'available_months' in snapshot['errors']:
+    st.error(f"Error connecting to Database: {snapshot['errors']['available_months']}")
     st.info("Make sure you've set up the DB2 connection and added your credentials to Streamlit secrets.")
     st.stop()
+available_months = snapshot['available_months']
+if not available_months:
+    available_months = [get_month_sheet_name()]
+selected_month = st.sidebar.selectbox("Select Month", available_months, index=0, key="selected_month")
 
-page = st.sidebar.radio("Navigation", ["Dashboard", "Add Expense", "Manage Categories", "Settings"])
+page = st.sidebar.radio("Navigation", ["Dashboard", "Add Expense", "Manage Categories", "Settings"], key="nav_page")
 
-# Fetch Categories
-@st.cache_data(ttl=60)
-def get_categories_cached():
-    return get_categories()
-
-categories_data = get_categories_cached()
+# Categories come from db_client's in-process directory shared by all sessions
+categories_data = snapshot['categories']
 category_names = [c['name'] for c in categories_data]
 category_map = {c['name']: i for i, c in enumerate(categories_data)}
 
 if page == "Dashboard":
     st.title(f"Dashboard - {selected_month}")
     
-    # Fetch Transactions for selected month
-    transactions = get_transactions(selected_month)
+    # Totals are summed in the database; only a few rows come back.
+    # Reload month data only if the guess above was wrong.
+    if snapshot['month'] == selected_month:
+        month_data = snapshot
+    else:
+        month_data = load_month_data(selected_month, writes=writes)
+    for part, message in month_data['errors'].items():
+        st.warning(f"Could not load {part.replace('_', ' ')}: {message}")
+    summary = month_data['summary'] or {'count': 0}
     
-    if transactions:
-        df = pd.DataFrame(transactions)
-        df['amount'] = pd.to_numeric(df['amount'])
-        
-        # Calculate totals
-        total_spent = df['amount'].sum()
-        total_planned = sum(float(c['planned_amount']) for c in categories_data)
+    if summary['count']:
+        spent_cents = summary['spent_cents']
+        planned_cents = summary['planned_cents']
         
         col1, col2 = st.columns(2)
-        col1.metric("Total Spent", f"${total_spent:.2f}")
-        col2.metric("Total Planned", f"${total_planned:.2f}", delta=f"${total_planned - total_spent:.2f}")
+        col1.metric("Total Spent", f"${format_cents(spent_cents)}")
+        col2.metric("Total Planned", f"${format_cents(planned_cents)}", delta=f"${format_cents(planned_cents - spent_cents)}")
         
         st.subheader("Progress by Category")
-        # Group by category
-        category_spending = df.groupby('category')['amount'].sum().reset_index()
+        category_spending = pd.DataFrame(
+            month_data['category_totals'], columns=['category', 'amount_cents', 'amount', 'count']
+        )
         
-        # Import the new chart function
-        from utils.charts import category_progress_chart
+        # Plotly is only loaded by the pages that draw charts
+        from utils.charts import category_progress_chart, pie_chart, cumulative_spending_chart
         st.plotly_chart(category_progress_chart(categories_data, category_spending), use_container_width=True, key="category_progress")
             
         st.subheader("Spending Distribution")
         st.plotly_chart(pie_chart(category_spending), use_container_width=True, key="pie_chart")
         
-        # Recent Transactions with delete option
-        st.subheader("Recent Transactions")
+        st.subheader("Daily Spending")
+        daily_totals = pd.DataFrame(month_data['daily_totals'], columns=['date', 'amount', 'cumulative'])
+        st.plotly_chart(cumulative_spending_chart(daily_totals), use_container_width=True, key="daily_spending")
         
-        df_sorted = df.sort_values('date', ascending=False)
+        # The whole month in one virtualized grid; select rows to delete them together
+        st.subheader("Transactions")
         
-        for idx, row in df_sorted.head(20).iterrows():
-            col1, col2, col3, col4, col5 = st.columns([2, 2, 1, 2, 1])
-            with col1:
-                st.write(f"**{row['vendor']}**")
-            with col2:
-                st.write(f"{row['category']}")
-            with col3:
-                st.write(f"${row['amount']:.2f}")
-            with col4:
-                st.write(row['date'])
-            with col5:
-                if st.button("🗑️", key=f"delete_{idx}"):
-                    try:
-                        delete_transaction(selected_month, row['row'])
-                        st.success("Deleted!")
-                        st.cache_data.clear()
-                        time.sleep(0.5)
-                        st.rerun()
-                    except Exception as e:
-                        st.error(f"Error: {e}")
+        rows = month_data['transactions']
+        grid = pd.DataFrame({
+            'Date': [row['date'] for row in rows],
+            'Vendor': [row['vendor'] for row in rows],
+            'Category': [row['category'] for row in rows],
+            'Amount': [row['amount_cents'] / 100 for row in rows],
+            'Notes': [row['notes'] for row in rows],
+            # Not saved yet (in flight or in the write-behind journal); deletable once saved
+            'Status': ["⚠️ not saved" if row.get('failed') else "⏳ saving" if row.get('pending') else "" for row in rows],
+        })
+        # Keyed on the data it shows, so a selection never outlives the rows it points at
+        grid_key = f"transactions_{selected_month}_{month_data['data_version']}_{month_data['pending_version']}"
+        event = st.dataframe(
+            grid,
+            key=grid_key,
+            on_select="rerun",
+            selection_mode="multi-row",
+            hide_index=True,
+            use_container_width=True,
+            column_config={'Amount': st.column_config.NumberColumn(format="$%.2f")},
+        )
+        selected = [rows[i] for i in event.selection.rows if rows[i]['id'] is not None]
+        if st.button(f"🗑️ Delete selected ({len(selected)})", disabled=not selected, key="delete_selected"):
+            writes.delete(selected, f"delete {len(selected)} transaction(s)")
+            st.session_state.notice = f"Deleted {len(selected)} transaction(s)!"
+            st.rerun()
         
     else:
         st.info("No transactions found for this month. Add some expenses!")
+    
+    # Every month, newest first, a page at a time. Pages are keyset cursors, so
+    # going further back costs no more and rows added meanwhile don't shift them.
+    if st.toggle("📜 Browse all history", key="show_history"):
+        cursors = st.session_state.setdefault('history_cursors', [None])
+        history, next_cursor = list_transactions(after=cursors[-1], limit=HISTORY_PAGE_SIZE)
+        if history:
+            st.dataframe(
+                pd.DataFrame({
+                    'Date': [row['date'] for row in history],
+                    'Vendor': [row['vendor'] for row in history],
+                    'Category': [row['category'] for row in history],
+                    'Amount': [row['amount_cents'] / 100 for row in history],
+                    'Notes': [row['notes'] for row in history],
+                }),
+                hide_index=True,
+                use_container_width=True,
+                column_config={'Amount': st.column_config.NumberColumn(format="$%.2f")},
+            )
+        else:
+            st.caption("No transactions yet.")
+        col1, col2 = st.columns(2)
+        if col1.button("⬅️ Newer", disabled=len(cursors) == 1, key="history_newer"):
+            cursors.pop()
+            st.rerun()
+        if col2.button("Older ➡️", disabled=next_cursor is None, key="history_older"):
+            cursors.append(next_cursor)
+            st.rerun()
 
 elif page == "Add Expense":
     st.title("Add Expense")
     
-    tab_receipt, tab_ai, tab_manual = st.tabs(["📸 Receipt Photo", "🤖 AI Input", "✍️ Manual Input"])
+    tab_receipt, tab_ai, tab_manual, tab_import = st.tabs(["📸 Receipt Photo", "🤖 AI Input", "✍️ Manual Input", "📥 Import"])
     
     with tab_receipt:
         st.subheader("Scan Receipt")
@@ -244,55 +311,51 @@ elif page == "Add Expense":
                     'category': new_category
                 }
             
-            # Regroup items by category for display
-            category_totals = {}
-            for item in st.session_state.individual_items:
-                cat = item['category']
-                if cat not in category_totals:
-                    category_totals[cat] = 0
-                category_totals[cat] += item['amount']
+            # Regroup items by category for display, in exact cents
+            items = st.session_state.individual_items
+            item_cents = MoneyArray.from_amounts(item['amount'] for item in items)
+            category_totals = item_cents.group_totals([item['category'] for item in items])
             
             st.divider()
             st.write("**Category Totals:**")
             for cat, total in category_totals.items():
-                st.write(f"  • {cat}: ${total:.2f}")
+                st.write(f"  • {cat}: ${format_cents(total)}")
             
             # Show discounts if any
             discounts = result.get('discounts', [])
-            total_discounts = result.get('total_discounts', 0)
+            total_discounts_cents = result.get('total_discounts_cents', 0)
             if discounts:
                 st.write("**Discounts:**")
                 for discount in discounts:
-                    st.write(f"  • {discount.get('description', 'Discount')}: ${discount.get('amount', 0):.2f}")
+                    st.write(f"  • {discount.get('description', 'Discount')}: ${format_cents(to_cents(discount.get('amount', 0)))}")
             
             # Show tax
-            tax = result.get('tax', 0)
-            if tax > 0:
-                st.write(f"**Tax:** ${tax:.2f}")
+            tax_cents = result.get('tax_cents', 0)
+            if tax_cents > 0:
+                st.write(f"**Tax:** ${format_cents(tax_cents)}")
             
             # Show totals and validation
             st.divider()
-            receipt_total = result.get('receipt_total', 0)
-            calculated_subtotal = sum(item['amount'] for item in st.session_state.individual_items)
-            calculated_total = calculated_subtotal + total_discounts + tax
-            total_diff = abs(calculated_total - receipt_total) if receipt_total > 0 else 0
-            total_valid = total_diff < (receipt_total * 0.01) if receipt_total > 0 else True
+            receipt_total_cents = result.get('receipt_total_cents', 0)
+            calculated_total_cents = item_cents.total() + total_discounts_cents + tax_cents
+            total_diff_cents = abs(calculated_total_cents - receipt_total_cents) if receipt_total_cents > 0 else 0
+            total_valid = total_diff_cents * 100 < receipt_total_cents if receipt_total_cents > 0 else True
             
             col1, col2, col3 = st.columns(3)
             with col1:
-                st.write(f"**Receipt Total:** ${receipt_total:.2f}")
+                st.write(f"**Receipt Total:** ${format_cents(receipt_total_cents)}")
             with col2:
-                st.write(f"**Calculated Total:** ${calculated_total:.2f}")
+                st.write(f"**Calculated Total:** ${format_cents(calculated_total_cents)}")
             with col3:
-                if not total_valid and receipt_total > 0:
-                    st.write(f"**Difference:** ${total_diff:.2f}")
+                if not total_valid and receipt_total_cents > 0:
+                    st.write(f"**Difference:** ${format_cents(total_diff_cents)}")
             
             # Option to use receipt total if there's a mismatch
             use_receipt_total = False
-            if not total_valid and receipt_total > 0:
-                st.warning(f"⚠️ Totals don't match (difference: ${total_diff:.2f}). This might be due to missing discounts or rounding.")
+            if not total_valid and receipt_total_cents > 0:
+                st.warning(f"⚠️ Totals don't match (difference: ${format_cents(total_diff_cents)}). This might be due to missing discounts or rounding.")
                 use_receipt_total = st.checkbox(
-                    f"Use receipt total (${receipt_total:.2f}) and distribute difference across categories",
+                    f"Use receipt total (${format_cents(receipt_total_cents)}) and distribute difference across categories",
                     key="use_receipt_total"
                 )
             
@@ -301,35 +364,29 @@ elif page == "Add Expense":
             with col1:
                 if st.button("💾 Save All", type="primary", key="save_items"):
                     try:
-                        # Regroup by category
-                        final_groups = {}
-                        for item in st.session_state.individual_items:
-                            cat = item['category']
-                            if cat not in final_groups:
-                                final_groups[cat] = 0
-                            final_groups[cat] += item['amount']
+                        final_groups = dict(category_totals)
                         
-                        # If using receipt total, adjust proportionally
-                        if use_receipt_total and receipt_total > 0:
-                            adjustment_factor = receipt_total / calculated_total if calculated_total > 0 else 1
-                            final_groups = {cat: amt * adjustment_factor for cat, amt in final_groups.items()}
+                        # If using receipt total, split it across categories in proportion;
+                        # leftover cents are placed deterministically so the groups add up exactly
+                        if use_receipt_total and receipt_total_cents > 0:
+                            final_groups = dict(zip(final_groups, allocate(receipt_total_cents, final_groups.values())))
                         
-                        saved_count = 0
-                        for category, amount in final_groups.items():
-                            add_transaction(
-                                category=category,
-                                amount=amount,
-                                vendor=f"Receipt ({len([i for i in st.session_state.individual_items if i['category'] == category])} items)",
-                                notes=f"Receipt total: ${receipt_total:.2f}",
-                                date=datetime.combine(datetime.now(), datetime.min.time())
-                            )
-                            saved_count += 1
+                        receipt_date = datetime.combine(datetime.now(), datetime.min.time())
+                        saved = [
+                            {
+                                'category': category,
+                                'amount': cents_to_decimal(cents),
+                                'vendor': f"Receipt ({len([i for i in items if i['category'] == category])} items)",
+                                'notes': f"Receipt total: ${format_cents(receipt_total_cents)}",
+                                'date': receipt_date
+                            }
+                            for category, cents in final_groups.items()
+                        ]
+                        writes.add(saved, "save the receipt")
                         
-                        st.success(f"✅ Saved {saved_count} category group(s)!")
+                        st.session_state.notice = f"✅ Saved {len(saved)} category group(s)!"
                         del st.session_state.receipt_data
                         del st.session_state.individual_items
-                        st.cache_data.clear()
-                        time.sleep(1)
                         st.rerun()
                     except Exception as e:
                         st.error(f"Error saving: {e}")
@@ -359,6 +416,7 @@ elif page == "Add Expense":
             if st.button("Parse with AI", type="primary", use_container_width=True):
                 if text_input:
                     with st.spinner("Parsing..."):
+                        from utils.categorizer import categorize_expense
                         result = categorize_expense(text_input, category_names)
                     
                     if "error" in result:
@@ -423,6 +481,7 @@ elif page == "Add Expense":
                                     st.success(f"✅ Transcribed: \"{transcribed_text}\"")
                                     
                                     # Immediately parse with AI
+                                    from utils.categorizer import categorize_expense
                                     parse_result = categorize_expense(transcribed_text, category_names)
                                     
                                     if "error" in parse_result:
@@ -484,22 +543,21 @@ elif page == "Add Expense":
                 with col1:
                     if st.button("Save All", type="primary"):
                         try:
-                            saved_count = 0
-                            for expense in st.session_state.edited_expenses:
-                                add_transaction(
-                                    category=expense['category'],
-                                    amount=expense['amount'],
-                                    vendor=expense['vendor'],
-                                    notes=expense['notes'],
-                                    date=datetime.combine(expense.get('date', datetime.now()), datetime.min.time())
-                                )
-                                saved_count += 1
+                            saved = [
+                                {
+                                    'category': expense['category'],
+                                    'amount': expense['amount'],
+                                    'vendor': expense['vendor'],
+                                    'notes': expense['notes'],
+                                    'date': datetime.combine(expense.get('date', datetime.now()), datetime.min.time())
+                                }
+                                for expense in st.session_state.edited_expenses
+                            ]
+                            writes.add(saved, f"save {len(saved)} expense(s)")
                             
-                            st.success(f"Saved {saved_count} expense(s)!")
+                            st.session_state.notice = f"Saved {len(saved)} expense(s)!"
                             del st.session_state.ai_expenses
                             del st.session_state.edited_expenses
-                            st.cache_data.clear()
-                            time.sleep(1)
                             st.rerun()
                         except Exception as e:
                             st.error(f"Error saving: {e}")
@@ -526,99 +584,99 @@ elif page == "Add Expense":
             
             if st.form_submit_button("Save Expense"):
                 try:
-                    add_transaction(
-                        category=category,
-                        amount=amount,
-                        vendor=vendor,
-                        notes=notes,
-                        date=datetime.combine(expense_date, datetime.min.time())
-                    )
-                    st.success("Expense saved!")
-                    st.cache_data.clear()
-                    time.sleep(1)
+                    writes.add([{
+                        'category': category,
+                        'amount': amount,
+                        'vendor': vendor,
+                        'notes': notes,
+                        'date': datetime.combine(expense_date, datetime.min.time())
+                    }], f"save {vendor or 'the expense'}")
+                    st.session_state.notice = "Expense saved!"
                     st.rerun()
                 except Exception as e:
                     st.error(f"Error saving: {e}")
 
+    with tab_import:
+        st.subheader("Import Statement")
+        st.info("Upload a CSV, OFX or QFX export from your bank. Lines you've already imported are skipped.")
+
+        statement = st.file_uploader("Statement file", type=["csv", "ofx", "qfx"])
+        col1, col2 = st.columns(2)
+        with col1:
+            default_names = category_names or ["Miscellaneous"]
+            default_category = st.selectbox(
+                "Category for unrecognized vendors", default_names,
+                index=default_names.index("Miscellaneous") if "Miscellaneous" in default_names else 0
+            )
+        with col2:
+            positive_expenses = st.checkbox("Charges are positive amounts (most credit card CSVs)")
+
+        if statement and st.button("Import Transactions", type="primary"):
+            progress_bar_widget = st.progress(0.0)
+            status = st.empty()
+
+            def show_progress(stats):
+                progress_bar_widget.progress(min(statement.tell() / max(statement.size, 1), 1.0))
+                status.write(f"{stats['read']} rows read · {stats['inserted']} imported · {stats['duplicates']} duplicates")
+
+            try:
+                stats = import_transactions(
+                    open_text(statement),
+                    fmt=detect_format(statement.name),
+                    default_category=default_category,
+                    positive_expenses=positive_expenses,
+                    progress=show_progress,
+                )
+                progress_bar_widget.progress(1.0)
+                st.success(
+                    f"Imported {stats['inserted']} transaction(s). "
+                    f"{stats['duplicates']} duplicate(s) and {stats['skipped']} credit(s) skipped."
+                )
+                if stats['errors']:
+                    st.warning(f"{stats['errors']} row(s) could not be read:\n\n" + "\n\n".join(stats['error_messages']))
+            except Exception as e:
+                st.error(f"Error importing: {e}")
+
 elif page == "Manage Categories":
     st.title("Manage Categories")
+    st.caption("Edit names and planned amounts in place, add rows at the bottom, or select rows and delete them. "
+               "Nothing is saved until you press Save changes; then everything is saved together.")
     
-    # Sort categories
-    st.subheader("Existing Categories")
-    
-    if not categories_data:
-        st.info("No categories yet. Add your first category below!")
-    else:
-        # Add sorting option
-        sort_by = st.radio("Sort by:", ["Name", "Planned Amount"], horizontal=True)
-        
-        categories_df = pd.DataFrame(categories_data)
-        if sort_by == "Name":
-            categories_df = categories_df.sort_values('name')
-        else:
-            categories_df['planned_amount'] = pd.to_numeric(categories_df['planned_amount'])
-            categories_df = categories_df.sort_values('planned_amount', ascending=False)
-        
-        # Display categories with edit and delete options
-        for idx, row in categories_df.iterrows():
-            col1, col2, col3, col4 = st.columns([3, 2, 1, 1])
-            with col1:
-                st.write(f"**{row['name']}**")
-            with col2:
-                st.write(f"Planned: ${float(row['planned_amount']):.2f}")
-            with col3:
-                # Edit button
-                if st.button("✏️", key=f"edit_{idx}"):
-                    st.session_state[f"editing_{idx}"] = True
-            with col4:
-                if st.button("🗑️", key=f"delete_cat_{idx}"):
-                    try:
-                        delete_category(row['name'])
-                        st.success("Deleted!")
-                        st.cache_data.clear()
-                        time.sleep(0.5)
-                        st.rerun()
-                    except Exception as e:
-                        st.error(f"Error: {e}")
-            
-            # Inline editing
-            if st.session_state.get(f"editing_{idx}", False):
-                with st.form(f"edit_form_{idx}"):
-                    new_name = st.text_input("Category Name", value=row['name'])
-                    new_planned = st.number_input("Planned Amount", value=float(row['planned_amount']), min_value=0.0, step=10.0)
-                    
-                    col_save, col_cancel = st.columns(2)
-                    with col_save:
-                        if st.form_submit_button("Save"):
-                            try:
-                                update_category(row['name'], new_name, new_planned)
-                                st.success("Updated!")
-                                del st.session_state[f"editing_{idx}"]
-                                st.cache_data.clear()
-                                time.sleep(0.5)
-                                st.rerun()
-                            except Exception as e:
-                                st.error(f"Error: {e}")
-                    with col_cancel:
-                        if st.form_submit_button("Cancel"):
-                            del st.session_state[f"editing_{idx}"]
-                            st.rerun()
-    
-    st.divider()
+    categories_df = Category.to_frame(categories_data)[['id', 'name', 'planned_amount']]
+    # Keyed on the category version: after a save (or a change from elsewhere) editing starts over from the stored list
+    edited = st.data_editor(
+        categories_df,
+        key=f"categories_{get_categories_version()}",
+        num_rows="dynamic",
+        hide_index=True,
+        use_container_width=True,
+        column_order=['name', 'planned_amount'],
+        column_config={
+            'name': st.column_config.TextColumn("Category", required=True, max_chars=255),
+            'planned_amount': st.column_config.NumberColumn("Planned Amount", min_value=0.0, step=10.0, format="$%.2f", required=True),
+        },
+    )
     
-    st.subheader("Add New Category")
-    with st.form("add_category"):
-        new_name = st.text_input("Category Name")
-        new_planned = st.number_input("Planned Amount", min_value=0.0, step=10.0)
-        
-        if st.form_submit_button("Add Category"):
-            try:
-                add_category(new_name, new_planned)
-                st.success("Category added!")
-                st.cache_data.clear()
-                st.rerun()
-            except Exception as e:
-                st.error(f"Error adding category: {e}")
+    # Added rows come back with no id
+    rows = [
+        {
+            'id': None if pd.isna(row.id) else int(row.id),
+            'name': '' if pd.isna(row.name) else str(row.name),
+            'planned_amount': 0 if pd.isna(row.planned_amount) else row.planned_amount,
+        }
+        for row in edited.itertuples(index=False)
+    ]
+    changes = diff_categories(categories_data, rows)
+    pending = sum(len(part) for part in changes.values())
+    if pending:
+        st.write(f"Unsaved: {len(changes['added'])} added, {len(changes['updated'])} changed, {len(changes['deleted'])} deleted")
+    if st.button(f"💾 Save changes ({pending})", type="primary", disabled=not pending, key="save_categories"):
+        try:
+            apply_category_changes(changes)
+            st.session_state.notice = f"Saved {pending} category change(s)!"
+            st.rerun()
+        except Exception as e:
+            st.error(f"Error saving categories: {e}")
 
 elif page == "Settings":
     st.title("Settings")
@@ -626,5 +684,108 @@ elif page == "Settings":
     st.info("Your budget data is stored in IBM DB2.")
     
     if st.button("Clear Cache"):
-        st.cache_data.clear()
+        read_cache.clear()
+        refresh_categories()
         st.success("Cache cleared!")
+
+    st.divider()
+    st.subheader("Export Transactions")
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        export_format = st.selectbox("Format", ["CSV", "Parquet"])
+    with col2:
+        export_scope = st.selectbox("Transactions", ["All months", f"Only {selected_month}"])
+    with col3:
+        compression_options = ["none", "gzip"] if export_format == "CSV" else ["snappy", "zstd", "gzip", "none"]
+        export_compression = st.selectbox("Compression", compression_options)
+
+    export_job = st.session_state.get('export_job')
+    if st.button("Prepare Export", disabled=bool(export_job and not export_job.done())):
+        if export_job:
+            export_job.discard()
+        export_job = start_export(
+            fmt=export_format.lower(),
+            month_name=None if export_scope == "All months" else selected_month,
+            compression=None if export_compression == "none" else export_compression,
+        )
+        st.session_state.export_job = export_job
+
+    if export_job:
+        if not export_job.done():
+            st.info(f"Exporting in the background... {export_job.rows_written} rows written so far.")
+            st.button("Check Progress")
+        elif export_job.error():
+            st.error(f"Export failed: {export_job.error()}")
+        else:
+            st.success(f"Export ready: {export_job.rows_written} transaction(s).")
+            with open(export_job.path, "rb") as f:
+                # The button serves its own copy of the bytes, so the file can go once it is clicked
+                st.download_button(
+                    "Download Export", f, file_name=export_job.file_name,
+                    on_click=lambda: st.session_state.pop('export_job').discard(),
+                )
+
+    st.divider()
+    st.subheader("Query Diagnostics")
+
+    diagnostics = get_diagnostics()
+    pool_stats = diagnostics['pool']
+    acquire = diagnostics['acquire']
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Connections in use", f"{pool_stats['in_use']} / {pool_stats['max_size']}")
+    col2.metric("Acquire p50", f"{acquire['p50_ms']:.1f} ms")
+    col3.metric("Acquire p99", f"{acquire['p99_ms']:.1f} ms")
+    col4.metric("Pool timeouts", pool_stats['timeouts'])
+
+    if diagnostics['statements']:
+        statements_df = pd.DataFrame(diagnostics['statements'], columns=[
+            'statement', 'calls', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms', 'total_ms',
+            'rows', 'errors', 'prepare_ms', 'execute_ms', 'fetch_ms'
+        ])
+        st.dataframe(statements_df.round(2), use_container_width=True, hide_index=True)
+    else:
+        st.info("No queries recorded yet.")
+
+    st.write(f"Slow queries (over {diagnostics['slow_query_ms']:.0f} ms)")
+    if diagnostics['slow_queries']:
+        st.dataframe(pd.DataFrame(diagnostics['slow_queries']).round({'ms': 2}), use_container_width=True, hide_index=True)
+    else:
+        st.caption("None so far.")
+
+    if st.button("Reset Query Stats"):
+        reset_query_stats()
+        st.rerun()
+
+    if replica.enabled():
+        st.divider()
+        st.subheader("Read Replica")
+        replica_stats = replica.get_replica().stats()
+        col1, col2, col3 = st.columns(3)
+        age = replica_stats['age_seconds']
+        col1.metric("Last sync", "never" if age is None else f"{age:.0f}s ago")
+        col2.metric("Max staleness", f"{replica_stats['max_staleness']:.0f}s")
+        col3.metric("Change seq", replica_stats['hwm'] if replica_stats['hwm'] is not None else "-")
+        if replica_stats['last_error']:
+            st.caption(f"Last error: {replica_stats['last_error']}")
+
+    if write_behind.enabled():
+        st.divider()
+        st.subheader("Pending Saves")
+        queue_stats = write_behind.get_queue().stats()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Waiting", queue_stats['pending'])
+        col2.metric("Failed", queue_stats['failed'])
+        col3.metric("Saved", queue_stats['flushed'])
+        if queue_stats['last_error']:
+            st.caption(f"Last error: {queue_stats['last_error']}")
+        if queue_stats['failed']:
+            st.caption("Failed saves are listed on the dashboard as not saved but are left out of the totals.")
+            col_retry, col_discard = st.columns(2)
+            if col_retry.button("Retry Failed Saves"):
+                write_behind.get_queue().retry_failed()
+                st.rerun()
+            if col_discard.button("Discard Failed Saves"):
+                discarded = write_behind.get_queue().discard_failed()
+                st.session_state.notice = f"Discarded {discarded} failed save(s)"
+                st.rerun()
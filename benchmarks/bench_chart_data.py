@@ -0,0 +1,99 @@
+"""
+Chart data preparation: the old per-category / mutate-and-sort code vs
+utils.chart_data, on synthetic transactions. Checks both give the same numbers.
+
+    python benchmarks/bench_chart_data.py --categories 500 --rows 300000
+"""
+import argparse
+import os
+import sys
+import time
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.chart_data import daily_cumulative, planned_vs_actual
+from utils.money import to_cents
+from utils.records import Category
+
+def fake_data(n_categories, n_rows, seed=0):
+    """Categories (a tenth never spent in) and a month of transactions across them."""
+    rng = np.random.default_rng(seed)
+    categories = [Category(i, f"Category {i:04d}", Decimal(int(rng.integers(1, 500_000))).scaleb(-2))
+                  for i in range(n_categories)]
+    spent_in = [c.name for c in categories[:max(1, n_categories * 9 // 10)]]
+    amount_cents = rng.integers(1, 50_000, size=n_rows)
+    transactions = pd.DataFrame({
+        'timestamp': pd.Timestamp('2026-03-01') + pd.to_timedelta(rng.integers(0, 31 * 86400, size=n_rows), unit='s'),
+        'category': pd.Categorical(rng.choice(spent_in, size=n_rows)),
+        'amount_cents': amount_cents,
+        'amount': amount_cents / 100.0,
+    })
+    return categories, transactions
+
+def legacy_planned_vs_actual(categories, spending):
+    """What category_progress_chart used to do: one mask over the frame per category."""
+    names, planned, actual = [], [], []
+    for cat in categories:
+        names.append(cat['name'])
+        planned.append(to_cents(cat['planned_amount']))
+        actual.append(int(spending.loc[spending['category'] == cat['name'], 'amount_cents'].sum()))
+    return names, planned, actual
+
+def legacy_daily(df):
+    """What daily_spending used to do (on a copy here, since it modified its input)."""
+    df = df.copy()
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    df = df.sort_values('timestamp')
+    daily = df.groupby(df['timestamp'].dt.date)['amount'].sum().reset_index()
+    daily['cumulative'] = daily['amount'].cumsum()
+    return daily
+
+def best_of(fn, repeat):
+    """(fastest seconds, result) over repeat calls."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+def report(label, old, new):
+    print(f"{label:<36}{old * 1000:>12.1f}{new * 1000:>12.1f}{old / new:>10.1f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--categories', type=int, default=500)
+    parser.add_argument('--rows', type=int, default=300_000)
+    parser.add_argument('--repeat', type=int, default=3, help="runs per case (fastest is reported)")
+    args = parser.parse_args()
+
+    categories, transactions = fake_data(args.categories, args.rows)
+    category_totals = (transactions.groupby('category', observed=True)['amount_cents'].sum()
+                       .rename_axis('category').reset_index())
+    print(f"{args.categories:,} categories, {args.rows:,} transactions\n")
+    print(f"{'case':<36}{'old ms':>12}{'new ms':>12}{'speedup':>11}")
+
+    for label, spending in [("planned vs actual (category totals)", category_totals),
+                            ("planned vs actual (transactions)", transactions)]:
+        old_time, (names, planned, actual) = best_of(lambda: legacy_planned_vs_actual(categories, spending), args.repeat)
+        new_time, data = best_of(lambda: planned_vs_actual(categories, spending), args.repeat)
+        assert data['category'].tolist() == names
+        assert data['planned_cents'].tolist() == planned and data['actual_cents'].tolist() == actual
+        report(label, old_time, new_time)
+
+    before = transactions.copy()
+    old_time, old_daily = best_of(lambda: legacy_daily(transactions), args.repeat)
+    new_time, new_daily = best_of(lambda: daily_cumulative(transactions), args.repeat)
+    assert list(new_daily['date']) == list(old_daily['timestamp'])
+    assert np.allclose(new_daily['cumulative'], old_daily['cumulative'])
+    assert transactions.equals(before), "daily_cumulative modified its input"
+    report("daily cumulative", old_time, new_time)
+
+    print("\nResults match; inputs unchanged.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""
+Memory footprint of transaction rows: the old dict rows vs Transaction records
+vs the columnar frame, for the same N rows. Then the frame loaded from a
+temporary SQLite database two ways: records via get_transactions, or straight
+from the cursor via get_transactions_frame.
+
+    python benchmarks/bench_records.py --rows 1000000 --db-rows 200000
+"""
+import argparse
+import gc
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.records import Transaction
+
+VENDORS = [f"Vendor {i}" for i in range(200)]
+CATEGORIES = ['Housing', 'Utilities', 'Transportation', 'Groceries', 'Dining Out',
+              'Healthcare', 'Personal Care', 'Entertainment', 'Debt & Savings', 'Miscellaneous']
+
+def fake_rows(n):
+    """Row tuples shaped like the SELECT in get_transactions (one datetime/Decimal per row, as a driver returns them)."""
+    start = datetime(2020, 1, 1)
+    return [
+        (i, start + timedelta(minutes=7 * i), VENDORS[i % len(VENDORS)], CATEGORIES[i % len(CATEGORIES)],
+         Decimal(i % 50000).scaleb(-2), '')
+        for i in range(n)
+    ]
+
+def as_dicts(rows):
+    """What get_transactions used to build per row."""
+    return [{
+        'date': timestamp.strftime('%Y-%m-%d'),
+        'vendor': vendor,
+        'category': category,
+        'amount': float(amount),
+        'notes': notes,
+        'row': row_id,
+        'id': row_id,
+    } for row_id, timestamp, vendor, category, amount, notes in rows]
+
+def as_records(rows):
+    return [Transaction.from_row(*row) for row in rows]
+
+def measure(build, rows):
+    gc.collect()
+    tracemalloc.start()
+    result = build(rows)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak
+
+def load_database(path, rows):
+    """A fresh SQLite database from schema_sqlite.sql holding rows (from fake_rows) for the default user."""
+    import db_client
+
+    root = os.path.join(os.path.dirname(__file__), '..')
+    with open(os.path.join(root, 'schema_sqlite.sql')) as f:
+        schema = f.read()
+    conn = sqlite3.connect(path)
+    try:
+        conn.executescript(schema)
+        conn.execute("INSERT INTO users (id, email, password_hash) VALUES (?, 'bench@example.com', '')",
+                     [db_client.DEFAULT_USER_ID])
+        category_ids = dict(conn.execute("SELECT name, id FROM categories"))
+        conn.executemany(
+            "INSERT INTO transactions (user_id, category_id, amount, vendor, notes, timestamp) VALUES (?, ?, ?, ?, ?, ?)",
+            ((db_client.DEFAULT_USER_ID, category_ids[category], str(amount), vendor, notes, timestamp.isoformat(' '))
+             for _, timestamp, vendor, category, amount, notes in rows)
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+def bench_loaders(n):
+    """Time and peak memory of get_transactions + Transaction.to_frame vs get_transactions_frame over n rows."""
+    tmp = tempfile.TemporaryDirectory(prefix='bench_records_')
+    path = os.path.join(tmp.name, 'bench.db')
+    os.environ['DB_BACKEND'] = 'sqlite'
+    os.environ['SQLITE_PATH'] = path
+    import db_client
+
+    load_database(path, fake_rows(n))
+    # Open the pool (and settings lookups) before timing anything
+    db_client.get_transactions('1900-01')
+    print(f"\n{n:,} rows loaded from SQLite\n")
+    print(f"{'loader':<34}{'seconds':>10}{'peak MB':>10}")
+
+    def via_records(_):
+        return Transaction.to_frame(db_client.get_transactions())
+
+    def via_cursor(_):
+        return db_client.get_transactions_frame()
+
+    frames = []
+    for label, build in [("get_transactions + to_frame", via_records),
+                         ("get_transactions_frame", via_cursor)]:
+        start = time.perf_counter()
+        frame, current, peak = measure(build, None)
+        print(f"{label:<34}{time.perf_counter() - start:>10.2f}{peak / 1e6:>10.1f}")
+        frames.append(frame)
+        del frame
+
+    # Same rows, but ties on timestamp may come back in either order from get_transactions
+    old, new = (f.sort_values(['timestamp', 'id'], ascending=False, ignore_index=True) for f in frames)
+    assert len(new) == n and new.equals(old), "get_transactions_frame differs from the records' frame"
+    db_client.close_pool()
+    tmp.cleanup()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--db-rows', type=int, default=200_000, help="rows for the database loaders (0 to skip)")
+    args = parser.parse_args()
+
+    rows = fake_rows(args.rows)
+    print(f"{args.rows:,} rows (bytes allocated on top of the driver's row tuples)\n")
+    print(f"{'representation':<22}{'total MB':>10}{'bytes/row':>11}{'peak MB':>10}")
+
+    dicts, current, peak = measure(as_dicts, rows)
+    print(f"{'dict rows':<22}{current / 1e6:>10.1f}{current / args.rows:>11.0f}{peak / 1e6:>10.1f}")
+    dict_bytes = current
+    del dicts
+
+    records, current, peak = measure(as_records, rows)
+    print(f"{'Transaction records':<22}{current / 1e6:>10.1f}{current / args.rows:>11.0f}{peak / 1e6:>10.1f}")
+    record_bytes = current
+    del rows
+
+    frame, current, peak = measure(Transaction.to_frame, records)
+    frame_bytes = frame.memory_usage(deep=True).sum()
+    print(f"{'columnar frame':<22}{frame_bytes / 1e6:>10.1f}{frame_bytes / args.rows:>11.0f}{peak / 1e6:>10.1f}")
+
+    print(f"\nrecords vs dicts: {dict_bytes / record_bytes:.1f}x smaller")
+    del records, frame
+
+    if args.db_rows:
+        bench_loaders(args.db_rows)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Cold-start import profile of the Streamlit app.
+
+Imports everything app.py imports at module level (found by parsing it) in a
+fresh interpreter with `-X importtime`, then reports total import time, the
+slowest top-level packages, and the share the app's own modules add on top of
+the third-party imports alone (the framework baseline). Exits with status 1 if
+the app's modules pull in an SDK that should be loaded lazily (Streamlit and
+pandas bring some of these themselves; those are not counted).
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --repeat 5 --top 15
+"""
+import argparse
+import ast
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Only the pages/actions that use them should pay for these
+LAZY_PACKAGES = ['ibm_watsonx_ai', 'ibm_watson', 'ibm_cloud_sdk_core', 'PIL', 'pillow_heif',
+                 'plotly', 'pydub', 'streamlit_mic_recorder', 'pyarrow']
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+def startup_imports(path):
+    """Module names app.py imports at module level (not inside functions or branches)."""
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), path)
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+def is_local(module):
+    top = module.split('.')[0]
+    return os.path.exists(os.path.join(ROOT, top + '.py')) or os.path.isdir(os.path.join(ROOT, top))
+
+def packages_of(rows):
+    """Self time per top-level package, in microseconds."""
+    packages = {}
+    for self_us, cumulative_us, depth, name in rows:
+        package = name.split('.')[0]
+        packages[package] = packages.get(package, 0) + self_us
+    return packages
+
+def median_profile(modules, repeat):
+    """The run with the median total import time, as (total_us, rows), plus all totals."""
+    runs = [profile(modules) for _ in range(max(repeat, 1))]
+    totals = [sum(row[0] for row in rows) for rows in runs]
+    median = sorted(totals)[len(totals) // 2]
+    return median, runs[totals.index(median)], totals
+
+def profile(modules):
+    """Runs the imports in a fresh interpreter; returns [(self_us, cumulative_us, depth, name)]."""
+    code = "; ".join(f"import {m}" for m in modules)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"Import failed:\n{result.stderr[-2000:]}")
+    rows = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((int(self_us), int(cumulative_us), len(indent) // 2, name))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--app', default=os.path.join(ROOT, 'app.py'))
+    parser.add_argument('--repeat', type=int, default=3, help="fresh interpreters to run (median is reported)")
+    parser.add_argument('--top', type=int, default=10, help="slowest top-level packages to list")
+    args = parser.parse_args()
+
+    modules = startup_imports(args.app)
+    print(f"Startup imports of {os.path.relpath(args.app, ROOT)}: {', '.join(modules)}\n")
+
+    total, rows, totals = median_profile(modules, args.repeat)
+    packages = packages_of(rows)
+    baseline_modules = [m for m in modules if not is_local(m)]
+    baseline_total, baseline_rows, _ = median_profile(baseline_modules, args.repeat)
+    baseline_packages = packages_of(baseline_rows)
+
+    print(f"{'package':<28}{'ms':>10}")
+    for package, us in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{package:<28}{us / 1000:>10.1f}")
+
+    print(f"\nTotal import time: {total / 1000:.1f} ms "
+          f"(median of {len(totals)}, min {min(totals) / 1000:.1f} ms, {len(rows)} modules)")
+    print(f"Third-party baseline ({', '.join(baseline_modules)}): {baseline_total / 1000:.1f} ms")
+    # Modules the baseline never imported, i.e. what the app's own imports cost
+    baseline_names = {row[3] for row in baseline_rows}
+    added = [row for row in rows if row[3] not in baseline_names]
+    print(f"Added by the app's modules: {sum(row[0] for row in added) / 1000:.1f} ms ({len(added)} modules)")
+
+    loaded = sorted(p for p in LAZY_PACKAGES if p in packages and p not in baseline_packages)
+    if loaded:
+        print(f"Loaded at startup by the app but should be lazy: {', '.join(loaded)}")
+        return 1
+    print("No lazily-loaded SDKs imported at startup by the app's modules.")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,42 +1,25 @@
-import ibm_db
 import os
+import threading
+import time
+import re
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import islice
 from dotenv import load_dotenv
-from datetime import datetime
+from datetime import date, datetime
+from decimal import Decimal, ROUND_HALF_UP
 import uuid
 
+from utils.money import CENT
+from utils.records import Category, Transaction
+
 load_dotenv()
 
 DEFAULT_USER_ID = "default-user-001"
 
-def get_db_connection():
-    """
-    Establishes a connection to the IBM Db2 database.
-    """
-    # Try to get from Streamlit secrets first (for deployment)
-    try:
-        import streamlit as st
-        database = st.secrets.get("DB2_DATABASE")
-        hostname = st.secrets.get("DB2_HOSTNAME")
-        port = st.secrets.get("DB2_PORT")
-        uid = st.secrets.get("DB2_UID")
-        pwd = st.secrets.get("DB2_PWD")
-        security = st.secrets.get("DB2_SECURITY", "SSL")
-    except:
-        # Fall back to environment variables (for local development)
-        database = os.environ.get("DB2_DATABASE")
-        hostname = os.environ.get("DB2_HOSTNAME")
-        port = os.environ.get("DB2_PORT")
-        uid = os.environ.get("DB2_UID")
-        pwd = os.environ.get("DB2_PWD")
-        security = os.environ.get("DB2_SECURITY", "SSL")
-
-    if not all([database, hostname, port, uid, pwd]):
-        return None
-
-    # Create SSL certificate file if it doesn't exist
-    cert_path = "db2_ssl_cert.pem"
-    if not os.path.exists(cert_path):
-        cert_content = """-----BEGIN CERTIFICATE-----
+CERT_PATH = "db2_ssl_cert.pem"
+CERT_CONTENT = """-----BEGIN CERTIFICATE-----
 MIIDEjCCAfqgAwIBAgIJAP5KDwe3BNLbMA0GCSqGSIb3DQEBCwUAMB4xHDAaBgNV
 BAMME0lCTSBDbG91ZCBEYXRhYmFzZXMwHhcNMjAwMjI5MDQyMTAyWhcNMzAwMjI2
 MDQyMTAyWjAeMRwwGgYDVQQDDBNJQk0gQ2xvdWQgRGF0YWJhc2VzMIIBIjANBgkq
@@ -56,163 +39,1895 @@ CCqGH+CV6t5xX7oNMKuMICjEVgvsKZtjy49Unb5VYlt4oRwu1elgsD3czImn9KDD
 4puDAoa6r2KYdN1VLn7qwTmSl9SSNQ==
 -----END CERTIFICATE-----
 """
-        with open(cert_path, 'w') as f:
-            f.write(cert_content)
-
-    conn_str = (
-        f"DATABASE={database};"
-        f"HOSTNAME={hostname};"
-        f"PORT={port};"
-        f"PROTOCOL=TCPIP;"
-        f"UID={uid};"
-        f"PWD={pwd};"
-        f"SECURITY={security};"
-        f"SSLServerCertificate=db2_ssl_cert.pem;"
-    )
 
+def get_setting(name, default=None):
+    """
+    Reads a configuration value.
+    Streamlit secrets win (for deployment), then environment variables (for local development).
+    """
     try:
-        conn = ibm_db.connect(conn_str, "", "")
-        return conn
-    except Exception as e:
-        print(f"Error connecting to Db2: {e}")
-        return None
+        import streamlit as st
+        value = st.secrets.get(name)
+        if value is not None:
+            return value
+    except:
+        pass
+    return os.environ.get(name, default)
 
-def execute_query(conn, sql, params=None):
+_conn_str = None
+_conn_str_lock = threading.Lock()
+
+def _get_conn_str():
     """
-    Executes a SQL query.
-    If it's a SELECT statement, returns a list of dictionaries.
-    If it's an INSERT/UPDATE/DELETE, returns True on success.
+    Builds the Db2 connection string once per process.
+    Secrets lookup and the certificate file check only happen on the first call.
     """
-    if not conn:
-        return None
+    global _conn_str
+    if _conn_str is not None:
+        return _conn_str
 
-    try:
-        stmt = ibm_db.prepare(conn, sql)
-        if params:
-            # ibm_db expects a tuple for params
-            ibm_db.execute(stmt, tuple(params))
-        else:
-            ibm_db.execute(stmt)
+    with _conn_str_lock:
+        if _conn_str is not None:
+            return _conn_str
 
-        # Check if it's a SELECT query
-        if sql.strip().upper().startswith("SELECT") or sql.strip().upper().startswith("WITH"):
+        database = get_setting("DB2_DATABASE")
+        hostname = get_setting("DB2_HOSTNAME")
+        port = get_setting("DB2_PORT")
+        uid = get_setting("DB2_UID")
+        pwd = get_setting("DB2_PWD")
+        security = get_setting("DB2_SECURITY", "SSL")
+
+        if not all([database, hostname, port, uid, pwd]):
+            return None
+
+        # Create SSL certificate file if it doesn't exist
+        if not os.path.exists(CERT_PATH):
+            with open(CERT_PATH, 'w') as f:
+                f.write(CERT_CONTENT)
+
+        _conn_str = (
+            f"DATABASE={database};"
+            f"HOSTNAME={hostname};"
+            f"PORT={port};"
+            f"PROTOCOL=TCPIP;"
+            f"UID={uid};"
+            f"PWD={pwd};"
+            f"SECURITY={security};"
+            f"SSLServerCertificate={CERT_PATH};"
+        )
+        return _conn_str
+
+# ===== QUERY INSTRUMENTATION =====
+
+class LatencyHistogram:
+    """
+    Fixed log-scale latency histogram: constant memory however many samples it sees.
+    Buckets double from 50µs up to ~100s; percentiles are interpolated within a bucket.
+    """
+
+    BOUNDS = [0.00005 * 2 ** i for i in range(22)]
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        i = 0
+        bounds = self.BOUNDS
+        while i < len(bounds) and seconds > bounds[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, p):
+        """Estimated p-th percentile (0-100) in seconds."""
+        if not self.count:
+            return 0.0
+        rank = self.count * p / 100.0
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                low = self.BOUNDS[i - 1] if i > 0 else 0.0
+                # The bucket holding the max ends at the max, not at its bound
+                high = min(self.BOUNDS[i], self.max) if i < len(self.BOUNDS) else self.max
+                return min(low + (high - low) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+    def summary(self):
+        """Latency figures in milliseconds."""
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "p50_ms": self.percentile(50) * 1000,
+            "p95_ms": self.percentile(95) * 1000,
+            "p99_ms": self.percentile(99) * 1000,
+            "max_ms": self.max * 1000,
+        }
+
+class _StatementStats:
+    __slots__ = ("latency", "calls", "errors", "rows", "prepare", "execute", "fetch")
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.prepare = 0.0
+        self.execute = 0.0
+        self.fetch = 0.0
+
+class QueryTimer:
+    """
+    Timing for one statement, filled in by the backend as it prepares,
+    executes and fetches, and recorded once on finish().
+    """
+    __slots__ = ("stats", "sql", "prepare", "execute", "fetch", "rows", "finished")
+
+    def __init__(self, stats, sql):
+        self.stats = stats
+        self.sql = sql
+        self.prepare = 0.0
+        self.execute = 0.0
+        self.fetch = 0.0
+        self.rows = 0
+        self.finished = False
+
+    def finish(self, error=False):
+        if not self.finished:
+            self.finished = True
+            self.stats.record(self, error)
+
+@lru_cache(maxsize=512)
+def _statement_key(sql):
+    """
+    Groups statements that only differ in layout or batch size:
+    whitespace is collapsed and repeated placeholder lists / VALUES rows are folded.
+    """
+    key = " ".join(sql.split())
+    key = re.sub(r"\?(?:\s*,\s*\?)+", "?, ...", key)
+    key = re.sub(r"(\([^()]*\))(?:\s*,\s*\1)+", r"\1, ...", key)
+    return key
+
+class QueryStats:
+    """
+    Process-wide query timings: a latency histogram, row count and
+    prepare/execute/fetch breakdown per statement, connection-acquire latency,
+    and a log of the most recent statements slower than slow_query_ms.
+    """
+
+    def __init__(self, slow_query_ms=500.0, slow_log_size=50):
+        self.slow_query_ms = slow_query_ms
+        self._lock = threading.Lock()
+        self._statements = {}
+        self._acquire = LatencyHistogram()
+        self._slow = deque(maxlen=slow_log_size)
+
+    def start(self, sql):
+        return QueryTimer(self, sql)
+
+    def record(self, timer, error=False):
+        elapsed = timer.prepare + timer.execute + timer.fetch
+        key = _statement_key(timer.sql)
+        with self._lock:
+            stats = self._statements.get(key)
+            if stats is None:
+                stats = self._statements[key] = _StatementStats()
+            stats.latency.add(elapsed)
+            stats.calls += 1
+            stats.errors += 1 if error else 0
+            stats.rows += timer.rows
+            stats.prepare += timer.prepare
+            stats.execute += timer.execute
+            stats.fetch += timer.fetch
+            slow = self.slow_query_ms is not None and elapsed * 1000 >= self.slow_query_ms
+            if slow:
+                self._slow.append({
+                    "at": datetime.now(),
+                    "statement": key,
+                    "ms": elapsed * 1000,
+                    "rows": timer.rows,
+                    "error": error,
+                })
+        if slow:
+            print(f"Slow query ({elapsed * 1000:.0f} ms, {timer.rows} rows): {key[:200]}")
+
+    def record_acquire(self, seconds):
+        with self._lock:
+            self._acquire.add(seconds)
+
+    def statements(self):
+        """Per-statement figures, slowest total time first."""
+        with self._lock:
+            items = list(self._statements.items())
             result = []
-            dictionary = ibm_db.fetch_assoc(stmt)
-            while dictionary:
-                # Normalize keys to lowercase
-                clean_dict = {k.lower(): v for k, v in dictionary.items()}
-                result.append(clean_dict)
-                dictionary = ibm_db.fetch_assoc(stmt)
-            return result
-        else:
-            return True
-    except Exception as e:
+            for key, s in items:
+                row = {"statement": key, "calls": s.calls, "errors": s.errors, "rows": s.rows}
+                row.update(s.latency.summary())
+                row["total_ms"] = s.latency.total * 1000
+                row["prepare_ms"] = s.prepare * 1000
+                row["execute_ms"] = s.execute * 1000
+                row["fetch_ms"] = s.fetch * 1000
+                del row["count"]
+                result.append(row)
+        result.sort(key=lambda r: r["total_ms"], reverse=True)
+        return result
+
+    def acquire_latency(self):
+        with self._lock:
+            return self._acquire.summary()
+
+    def slow_queries(self):
+        """Most recent slow statements, newest first."""
+        with self._lock:
+            return list(reversed(self._slow))
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+            self._acquire = LatencyHistogram()
+            self._slow.clear()
+
+# The slow-query threshold is read from DB_SLOW_QUERY_MS when the pool is created
+query_stats = QueryStats()
+
+def get_query_stats():
+    """Per-statement latency (p50/p95/p99/max ms), calls, errors, rows and phase totals."""
+    return query_stats.statements()
+
+def get_slow_queries():
+    """Recent statements that took longer than DB_SLOW_QUERY_MS."""
+    return query_stats.slow_queries()
+
+def get_diagnostics():
+    """Everything the Settings diagnostics panel shows, in one dict."""
+    return {
+        "pool": get_pool_stats(),
+        "acquire": query_stats.acquire_latency(),
+        "statements": query_stats.statements(),
+        "slow_queries": query_stats.slow_queries(),
+        "slow_query_ms": query_stats.slow_query_ms,
+    }
+
+def reset_query_stats():
+    query_stats.reset()
+
+# ===== STORAGE BACKENDS =====
+
+class Db2Backend:
+    """
+    IBM Db2 on Cloud, accessed through ibm_db.
+    """
+    name = "db2"
+    label = "Db2"
+    schema_file = "schema.sql"
+    ping_sql = "SELECT 1 FROM SYSIBM.SYSDUMMY1"
+
+    def __init__(self):
+        import ibm_db
+        self.ibm_db = ibm_db
+
+    def connect(self):
+        conn_str = _get_conn_str()
+        if not conn_str:
+            return None
+
+        try:
+            return self.ibm_db.connect(conn_str, "", "")
+        except Exception as e:
+            print(f"Error connecting to Db2: {e}")
+            return None
+
+    def close(self, conn):
+        self.ibm_db.close(conn)
+
+    def is_active(self, conn):
+        return self.ibm_db.active(conn)
+
+    def ping(self, conn):
+        stmt = self.ibm_db.exec_immediate(conn, self.ping_sql)
+        self.ibm_db.fetch_tuple(stmt)
+
+    def begin(self, conn):
+        self.ibm_db.autocommit(conn, self.ibm_db.SQL_AUTOCOMMIT_OFF)
+
+    def commit(self, conn):
+        try:
+            self.ibm_db.commit(conn)
+        finally:
+            self.ibm_db.autocommit(conn, self.ibm_db.SQL_AUTOCOMMIT_ON)
+
+    def rollback(self, conn):
+        try:
+            self.ibm_db.rollback(conn)
+        finally:
+            self.ibm_db.autocommit(conn, self.ibm_db.SQL_AUTOCOMMIT_ON)
+
+    def free_statement(self, stmt):
+        try:
+            self.ibm_db.free_stmt(stmt)
+        except Exception:
+            pass
+
+    def _error(self, e):
         error_msg = f"Error executing query: {e}"
-        if hasattr(ibm_db, 'stmt_errormsg'):
+        if hasattr(self.ibm_db, 'stmt_errormsg'):
             try:
-                error_msg += f"\nDB2 Error: {ibm_db.stmt_errormsg()}"
+                error_msg += f"\nDB2 Error: {self.ibm_db.stmt_errormsg()}"
             except:
                 pass
         print(error_msg)
-        raise Exception(error_msg)
-    finally:
-        # We don't close the connection here to allow reuse, 
-        # but in a real app we might want to manage this better.
+        return Exception(error_msg)
+
+    def _run(self, conn, sql, params, statements, timer):
+        """Prepares (or reuses) and executes a statement, returning the ibm_db statement handle."""
+        ibm_db = self.ibm_db
+        try:
+            stmt = statements.get(sql) if statements is not None else None
+            if stmt is None:
+                started = time.perf_counter()
+                stmt = ibm_db.prepare(conn, sql)
+                timer.prepare = time.perf_counter() - started
+                if statements is not None:
+                    statements.put(sql, stmt)
+            started = time.perf_counter()
+            if params:
+                # ibm_db expects a tuple for params
+                ibm_db.execute(stmt, tuple(params))
+            else:
+                ibm_db.execute(stmt)
+            timer.execute = time.perf_counter() - started
+            return stmt
+        except Exception as e:
+            if statements is not None:
+                statements.discard(sql)
+            timer.finish(error=True)
+            raise self._error(e)
+
+    def execute(self, conn, sql, params=None, statements=None):
+        # Check if it's a SELECT query
+        if not (sql.strip().upper().startswith("SELECT") or sql.strip().upper().startswith("WITH")):
+            timer = query_stats.start(sql)
+            stmt = self._run(conn, sql, params, statements, timer)
+            try:
+                timer.rows = max(self.ibm_db.num_rows(stmt), 0)
+            except Exception:
+                pass
+            timer.finish()
+            return True
+
+        columns, rows, close = self.open_cursor(conn, sql, params, statements)
+        try:
+            return [dict(zip(columns, row)) for row in rows]
+        finally:
+            close()
+
+    def open_cursor(self, conn, sql, params=None, statements=None):
+        """
+        Executes a SELECT and returns (columns, row iterator, close).
+        Rows are plain tuples from fetch_tuple; column names are lowercased once.
+        Time spent in fetch_tuple and the row count are recorded when the cursor is closed.
+        """
+        ibm_db = self.ibm_db
+        timer = query_stats.start(sql)
+        stmt = self._run(conn, sql, params, statements, timer)
+        columns = tuple(ibm_db.field_name(stmt, i).lower() for i in range(ibm_db.num_fields(stmt)))
+
+        def rows():
+            fetch_tuple = ibm_db.fetch_tuple
+            clock = time.perf_counter
+            try:
+                started = clock()
+                row = fetch_tuple(stmt)
+                timer.fetch += clock() - started
+                while row:
+                    timer.rows += 1
+                    yield row
+                    started = clock()
+                    row = fetch_tuple(stmt)
+                    timer.fetch += clock() - started
+            except Exception as e:
+                timer.finish(error=True)
+                raise self._error(e)
+
+        def close():
+            timer.finish()
+            # Close the cursor so a cached statement can be executed again
+            try:
+                ibm_db.free_result(stmt)
+            except Exception:
+                pass
+
+        return columns, rows(), close
+
+    # --- dialect ---
+
+    def month_key(self, column):
+        """SQL expression turning a timestamp column into 'YYYY-MM'."""
+        return f"VARCHAR_FORMAT({column}, 'YYYY-MM')"
+
+    def cents(self, column):
+        """SQL expression turning a DECIMAL(10, 2) amount into exact integer cents."""
+        return f"BIGINT({column} * 100)"
+
+    def day_key(self, column):
+        """SQL expression truncating a timestamp column to its date."""
+        return f"DATE({column})"
+
+    def limit(self, n):
+        """Row-limiting clause appended after ORDER BY."""
+        return f"FETCH FIRST {int(n)} ROWS ONLY"
+
+    def monthly_totals_upsert(self, n):
+        """Adds n (user_id, month_key, category_id, total, txn_count) deltas to monthly_category_totals."""
+        row = ("(CAST(? AS VARCHAR(36)), CAST(? AS CHAR(7)), CAST(? AS INTEGER), "
+               "CAST(? AS DECIMAL(12, 2)), CAST(? AS INTEGER))")
+        values = ", ".join(row for _ in range(n))
+        return f"""
+            MERGE INTO monthly_category_totals m
+            USING (VALUES {values}) AS s (user_id, month_key, category_id, total, txn_count)
+            ON m.user_id = s.user_id AND m.month_key = s.month_key AND m.category_id = s.category_id
+            WHEN MATCHED THEN
+                UPDATE SET total = m.total + s.total, txn_count = m.txn_count + s.txn_count
+            WHEN NOT MATCHED THEN
+                INSERT (user_id, month_key, category_id, total, txn_count)
+                VALUES (s.user_id, s.month_key, s.category_id, s.total, s.txn_count)
+        """
+
+    def returning_id(self, insert_sql):
+        """Wraps a single-row INSERT so executing it returns the generated id."""
+        return f"SELECT id FROM FINAL TABLE ({insert_sql})"
+
+    def update_returning(self, update_sql, columns):
+        """Wraps an UPDATE so executing it returns these columns of the rows it changed (new values)."""
+        return f"SELECT {columns} FROM FINAL TABLE ({update_sql})"
+
+    def delete_returning(self, delete_sql, columns):
+        """Wraps a DELETE so executing it returns these columns of the rows it removed."""
+        return f"SELECT {columns} FROM OLD TABLE ({delete_sql})"
+
+    def index_exists(self, conn, name):
+        rows = self.execute(
+            conn,
+            "SELECT 1 FROM SYSCAT.INDEXES WHERE INDSCHEMA = CURRENT SCHEMA AND INDNAME = ?",
+            (name.upper(),)
+        )
+        return bool(rows)
+
+    def table_exists(self, conn, name):
+        rows = self.execute(
+            conn,
+            "SELECT 1 FROM SYSCAT.TABLES WHERE TABSCHEMA = CURRENT SCHEMA AND TABNAME = ?",
+            (name.upper(),)
+        )
+        return bool(rows)
+
+    def column_exists(self, conn, table, column):
+        rows = self.execute(
+            conn,
+            "SELECT 1 FROM SYSCAT.COLUMNS WHERE TABSCHEMA = CURRENT SCHEMA AND TABNAME = ? AND COLNAME = ?",
+            (table.upper(), column.upper())
+        )
+        return bool(rows)
+
+class SQLiteBackend:
+    """
+    Embedded SQLite database for local runs, tests and benchmarks.
+    The file is created and seeded from schema_sqlite.sql on first connect.
+    """
+    name = "sqlite"
+    label = "SQLite"
+    schema_file = "schema_sqlite.sql"
+    ping_sql = "SELECT 1"
+
+    def __init__(self, path="budget.db"):
+        import sqlite3
+        self.sqlite3 = sqlite3
+        self.path = path
+        self._uri = False
+        self._keepalive = None
+        if path == ":memory:":
+            # A plain ":memory:" database is private to one connection; use a named
+            # shared-cache database so every pooled connection sees the same data
+            self.path = f"file:budget-{uuid.uuid4().hex}?mode=memory&cache=shared"
+            self._uri = True
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+        # Store timestamps as ISO strings and hand them back as datetimes,
+        # matching what ibm_db returns for TIMESTAMP columns
+        sqlite3.register_adapter(datetime, lambda d: d.isoformat(" "))
+        sqlite3.register_adapter(Decimal, str)
+        sqlite3.register_converter("TIMESTAMP", lambda b: datetime.fromisoformat(b.decode()))
+
+    def connect(self):
+        sqlite3 = self.sqlite3
+        try:
+            conn = sqlite3.connect(
+                self.path,
+                detect_types=sqlite3.PARSE_DECLTYPES,
+                isolation_level=None,  # autocommit, like ibm_db
+                check_same_thread=False,  # pooled connections move between threads
+                uri=self._uri,
+                cached_statements=int(get_setting("DB_STATEMENT_CACHE_SIZE", 32)),
+            )
+            conn.execute("PRAGMA foreign_keys = ON")
+            conn.execute("PRAGMA journal_mode = WAL")
+            self._ensure_schema(conn)
+            return conn
+        except Exception as e:
+            print(f"Error connecting to SQLite: {e}")
+            return None
+
+    def _ensure_schema(self, conn):
+        """Creates the schema and the default user the first time the database file is opened."""
+        if self._initialized:
+            return
+        with self._init_lock:
+            if self._initialized:
+                return
+            exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'categories'"
+            ).fetchone()
+            if not exists:
+                schema_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), self.schema_file)
+                with open(schema_path, "r") as f:
+                    conn.executescript(f.read())
+                conn.execute(
+                    "INSERT INTO users (id, email, password_hash) VALUES (?, ?, ?)",
+                    (DEFAULT_USER_ID, "default@budgetapp.local", "no-password-needed")
+                )
+            if self._uri:
+                # An in-memory database disappears with its last connection
+                self._keepalive = self.sqlite3.connect(self.path, uri=True, check_same_thread=False)
+            self._initialized = True
+
+    def close(self, conn):
+        conn.close()
+
+    def is_active(self, conn):
+        try:
+            conn.total_changes
+            return True
+        except self.sqlite3.ProgrammingError:
+            return False
+
+    def ping(self, conn):
+        conn.execute(self.ping_sql).fetchone()
+
+    def begin(self, conn):
+        conn.execute("BEGIN")
+
+    def commit(self, conn):
+        conn.execute("COMMIT")
+
+    def rollback(self, conn):
+        conn.execute("ROLLBACK")
+
+    def free_statement(self, stmt):
         pass
 
+    def execute(self, conn, sql, params=None, statements=None):
+        # sqlite3 keeps its own per-connection statement cache (cached_statements),
+        # so there is nothing to prepare ahead of time here
+        timer = query_stats.start(sql)
+        try:
+            started = time.perf_counter()
+            cursor = conn.execute(sql, tuple(params) if params else ())
+            timer.execute = time.perf_counter() - started
+            if cursor.description is None:
+                timer.rows = max(cursor.rowcount, 0)
+                timer.finish()
+                return True
+            columns = [d[0].lower() for d in cursor.description]
+            started = time.perf_counter()
+            rows = cursor.fetchall()
+            timer.fetch = time.perf_counter() - started
+            timer.rows = len(rows)
+            timer.finish()
+            return [dict(zip(columns, row)) for row in rows]
+        except Exception as e:
+            timer.finish(error=True)
+            raise self._error(e)
+
+    def _error(self, e):
+        error_msg = f"Error executing query: {e}"
+        print(error_msg)
+        return Exception(error_msg)
+
+    def open_cursor(self, conn, sql, params=None, statements=None):
+        """
+        Executes a SELECT and returns (columns, row iterator, close).
+        Rows are fetched in small batches so fetch time can be measured cheaply.
+        """
+        timer = query_stats.start(sql)
+        try:
+            started = time.perf_counter()
+            cursor = conn.execute(sql, tuple(params) if params else ())
+            timer.execute = time.perf_counter() - started
+        except Exception as e:
+            timer.finish(error=True)
+            raise self._error(e)
+        columns = tuple(d[0].lower() for d in cursor.description or ())
+
+        def rows():
+            clock = time.perf_counter
+            try:
+                while True:
+                    started = clock()
+                    batch = cursor.fetchmany(256)
+                    timer.fetch += clock() - started
+                    if not batch:
+                        return
+                    timer.rows += len(batch)
+                    yield from batch
+            except Exception as e:
+                timer.finish(error=True)
+                raise self._error(e)
+
+        def close():
+            timer.finish()
+            cursor.close()
+
+        return columns, rows(), close
+
+    # --- dialect ---
+
+    def month_key(self, column):
+        """SQL expression turning a timestamp column into 'YYYY-MM'."""
+        return f"strftime('%Y-%m', {column})"
+
+    def cents(self, column):
+        """SQL expression turning a DECIMAL(10, 2) amount into exact integer cents."""
+        # SQLite stores DECIMAL as REAL, so round before truncating
+        return f"CAST(ROUND({column} * 100) AS INTEGER)"
+
+    def day_key(self, column):
+        """SQL expression truncating a timestamp column to its date ('YYYY-MM-DD' text)."""
+        return f"date({column})"
+
+    def limit(self, n):
+        """Row-limiting clause appended after ORDER BY."""
+        return f"LIMIT {int(n)}"
+
+    def monthly_totals_upsert(self, n):
+        """Adds n (user_id, month_key, category_id, total, txn_count) deltas to monthly_category_totals."""
+        values = ", ".join("(?, ?, ?, ?, ?)" for _ in range(n))
+        return f"""
+            INSERT INTO monthly_category_totals (user_id, month_key, category_id, total, txn_count)
+            VALUES {values}
+            ON CONFLICT (user_id, month_key, category_id) DO UPDATE SET
+                total = total + excluded.total,
+                txn_count = txn_count + excluded.txn_count
+        """
+
+    def returning_id(self, insert_sql):
+        """Wraps a single-row INSERT so executing it returns the generated id."""
+        return f"{insert_sql} RETURNING id"
+
+    def update_returning(self, update_sql, columns):
+        """Wraps an UPDATE so executing it returns these columns of the rows it changed (new values)."""
+        return f"{update_sql} RETURNING {columns}"
+
+    def delete_returning(self, delete_sql, columns):
+        """Wraps a DELETE so executing it returns these columns of the rows it removed."""
+        return f"{delete_sql} RETURNING {columns}"
+
+    def index_exists(self, conn, name):
+        rows = self.execute(
+            conn,
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?",
+            (name,)
+        )
+        return bool(rows)
+
+    def table_exists(self, conn, name):
+        rows = self.execute(
+            conn,
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (name,)
+        )
+        return bool(rows)
+
+    def column_exists(self, conn, table, column):
+        rows = self.execute(conn, f"PRAGMA table_info({table})")
+        return any(r['name'].lower() == column.lower() for r in rows)
+
+BACKENDS = {
+    "db2": Db2Backend,
+    "sqlite": SQLiteBackend,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_backend():
+    """
+    Returns the configured storage backend.
+    DB_BACKEND selects it ("db2" by default, or "sqlite"); SQLITE_PATH sets the SQLite file.
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = str(get_setting("DB_BACKEND", "db2")).lower()
+                if name not in BACKENDS:
+                    raise Exception(f"Unknown DB_BACKEND '{name}' (expected one of: {', '.join(BACKENDS)})")
+                if name == "sqlite":
+                    _backend = SQLiteBackend(get_setting("SQLITE_PATH", "budget.db"))
+                else:
+                    _backend = BACKENDS[name]()
+    return _backend
+
+def set_backend(backend):
+    """
+    Swaps the storage backend (e.g. SQLiteBackend(":memory:") in a benchmark).
+    The connection pool is rebuilt on next use.
+    """
+    global _backend
+    close_pool()
+    with _backend_lock:
+        _backend = backend
+    category_directory.invalidate()
+
+def get_db_connection():
+    """
+    Establishes a new, unpooled connection to the configured database.
+    Scripts (init_db.py, create_default_user.py) use this directly;
+    the app goes through the connection pool instead.
+    """
+    return get_backend().connect()
+
+# ===== CONNECTION POOL =====
+
+class StatementCache:
+    """
+    LRU cache of prepared statements for one connection, keyed by SQL text.
+    Lives and dies with its connection; evicted statements are freed.
+    """
+
+    def __init__(self, backend, capacity=32):
+        self.backend = backend
+        self.capacity = capacity
+        self._statements = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, sql):
+        stmt = self._statements.get(sql)
+        if stmt is None:
+            self.misses += 1
+            return None
+        self._statements.move_to_end(sql)
+        self.hits += 1
+        return stmt
+
+    def put(self, sql, stmt):
+        if self.capacity <= 0:
+            return
+        self._statements[sql] = stmt
+        self._statements.move_to_end(sql)
+        while len(self._statements) > self.capacity:
+            _, old = self._statements.popitem(last=False)
+            self.evictions += 1
+            self.backend.free_statement(old)
+
+    def discard(self, sql):
+        stmt = self._statements.pop(sql, None)
+        if stmt is not None:
+            self.backend.free_statement(stmt)
+
+    def clear(self):
+        for stmt in self._statements.values():
+            self.backend.free_statement(stmt)
+        self._statements.clear()
+
+    def __len__(self):
+        return len(self._statements)
+
+class _PoolEntry:
+    __slots__ = ("conn", "created_at", "last_used", "statements")
+
+    def __init__(self, conn, statements):
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.statements = statements
+
+class ConnectionPool:
+    """
+    Thread-safe pool of long-lived database connections.
+
+    One pool lives per process, so every Streamlit session shares it.
+    min_size connections are opened up front (prefill). Connections are
+    health-checked on checkout, replaced when they have died, and closed after
+    sitting idle for longer than idle_timeout (never dropping below min_size
+    idle connections).
+    """
+
+    def __init__(self, backend, min_size=1, max_size=5, idle_timeout=300.0,
+                 acquire_timeout=10.0, health_check_interval=30.0, statement_cache_size=32):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.backend = backend
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+        self.statement_cache_size = statement_cache_size
+
+        self._cond = threading.Condition()
+        self._idle = []          # LIFO stack of _PoolEntry, most recently used last
+        self._in_use = {}        # id(conn) -> _PoolEntry
+        self._reserved = 0       # slots claimed by callers that are still connecting
+        self._closed = False
+        self._stats = {
+            "checkouts": 0,
+            "connections_created": 0,
+            "connections_closed": 0,
+            "health_check_failures": 0,
+            "connect_failures": 0,
+            "timeouts": 0,
+            "waits": 0,
+            "total_wait_time": 0.0,
+            "max_wait_time": 0.0,
+        }
+        # Statement cache counters from connections that have since been closed
+        self._retired_statement_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    # --- internal helpers ---
+
+    def _close_conn(self, conn, statements=None):
+        if statements is not None:
+            try:
+                statements.clear()
+            except Exception:
+                pass
+        try:
+            self.backend.close(conn)
+        except Exception:
+            pass
+        with self._cond:
+            self._stats["connections_closed"] += 1
+            if statements is not None:
+                retired = self._retired_statement_stats
+                retired["hits"] += statements.hits
+                retired["misses"] += statements.misses
+                retired["evictions"] += statements.evictions
+
+    def _is_healthy(self, entry):
+        """Cheap liveness check, plus a real round trip if the connection sat idle for a while."""
+        try:
+            if not self.backend.is_active(entry.conn):
+                return False
+            if time.monotonic() - entry.last_used >= self.health_check_interval:
+                self.backend.ping(entry.conn)
+            return True
+        except Exception:
+            return False
+
+    def _evict_idle_locked(self):
+        """Pops idle connections past idle_timeout. Caller holds the lock and closes them."""
+        now = time.monotonic()
+        expired = []
+        # Oldest entries sit at the bottom of the stack
+        while len(self._idle) > self.min_size and now - self._idle[0].last_used > self.idle_timeout:
+            expired.append(self._idle.pop(0))
+        return expired
+
+    # --- public API ---
+
+    def prefill(self):
+        """
+        Opens connections until min_size are idle, so the first requests don't
+        wait on connecting. Stops at the first failure. Returns how many were opened.
+        """
+        opened = 0
+        while True:
+            with self._cond:
+                if self._closed or len(self._idle) + len(self._in_use) + self._reserved >= self.min_size:
+                    return opened
+                self._reserved += 1
+            conn = self.backend.connect()
+            with self._cond:
+                self._reserved -= 1
+                if not conn:
+                    self._stats["connect_failures"] += 1
+                    self._cond.notify()
+                    return opened
+                self._stats["connections_created"] += 1
+                closed = self._closed
+                if not closed:
+                    # Bottom of the stack: already-used connections are handed out first
+                    self._idle.insert(0, _PoolEntry(conn, StatementCache(self.backend, self.statement_cache_size)))
+                    self._cond.notify()
+            if closed:
+                self._close_conn(conn)
+                return opened
+            opened += 1
+
+    def acquire(self, timeout=None):
+        """
+        Checks out a connection.
+        Returns None if no connection could be established or none freed up within the timeout.
+        """
+        timeout = self.acquire_timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        waited = False
+        timed_out = False
+        entry = None
+        expired = []
+
+        with self._cond:
+            if self._closed:
+                raise Exception("Connection pool is closed")
+            while True:
+                expired.extend(self._evict_idle_locked())
+                if self._idle:
+                    entry = self._idle.pop()
+                    break
+                if len(self._in_use) + self._reserved < self.max_size:
+                    self._reserved += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    timed_out = True
+                    break
+                waited = True
+                self._cond.wait(remaining)
+
+        for old in expired:
+            self._close_conn(old.conn, old.statements)
+
+        if timed_out:
+            query_stats.record_acquire(time.monotonic() - start)
+            print(f"Timed out after {timeout:.1f}s waiting for a database connection")
+            return None
+
+        # Health check outside the lock so a slow ping doesn't block other sessions
+        if entry is not None and not self._is_healthy(entry):
+            with self._cond:
+                self._stats["health_check_failures"] += 1
+                self._reserved += 1
+            self._close_conn(entry.conn, entry.statements)
+            entry = None
+
+        if entry is None:
+            conn = self.backend.connect()
+            with self._cond:
+                self._reserved -= 1
+                if not conn:
+                    self._stats["connect_failures"] += 1
+                    self._cond.notify()
+                    return None
+                self._stats["connections_created"] += 1
+            entry = _PoolEntry(conn, StatementCache(self.backend, self.statement_cache_size))
+
+        wait_time = time.monotonic() - start
+        query_stats.record_acquire(wait_time)
+        with self._cond:
+            self._in_use[id(entry.conn)] = entry
+            self._stats["checkouts"] += 1
+            self._stats["total_wait_time"] += wait_time
+            self._stats["max_wait_time"] = max(self._stats["max_wait_time"], wait_time)
+            if waited:
+                self._stats["waits"] += 1
+        return entry.conn
+
+    def release(self, conn, discard=False):
+        """Returns a connection to the pool, or closes it if discard is set or it has died."""
+        if conn is None:
+            return
+        with self._cond:
+            entry = self._in_use.pop(id(conn), None)
+            closed = self._closed
+        if entry is None:
+            # Not one of ours; just close it
+            self._close_conn(conn)
+            return
+
+        if not discard:
+            try:
+                discard = not self.backend.is_active(conn)
+            except Exception:
+                discard = True
+
+        if discard or closed:
+            self._close_conn(conn, entry.statements)
+            with self._cond:
+                self._cond.notify()
+            return
+
+        entry.last_used = time.monotonic()
+        with self._cond:
+            self._idle.append(entry)
+            self._cond.notify()
+
+    def statement_cache(self, conn):
+        """The prepared-statement cache of a checked-out connection, or None if it isn't pooled."""
+        entry = self._in_use.get(id(conn))
+        return entry.statements if entry is not None else None
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """
+        Context manager around acquire/release.
+        Yields None when no connection is available, mirroring get_db_connection().
+        A connection that raised and is no longer active is dropped instead of reused.
+        """
+        conn = self.acquire(timeout=timeout)
+        failed = False
+        try:
+            yield conn
+        except Exception:
+            failed = True
+            raise
+        finally:
+            if conn:
+                discard = False
+                if failed:
+                    try:
+                        discard = not self.backend.is_active(conn)
+                    except Exception:
+                        discard = True
+                self.release(conn, discard=discard)
+
+    def stats(self):
+        """Snapshot of pool counters for sizing and diagnostics."""
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                "in_use": len(self._in_use),
+                "idle": len(self._idle),
+                "connecting": self._reserved,
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+            })
+            statement_stats = dict(self._retired_statement_stats)
+            live = [e.statements for e in self._idle] + [e.statements for e in self._in_use.values()]
+        for cache in live:
+            statement_stats["hits"] += cache.hits
+            statement_stats["misses"] += cache.misses
+            statement_stats["evictions"] += cache.evictions
+        stats["statement_cache_hits"] = statement_stats["hits"]
+        stats["statement_cache_misses"] = statement_stats["misses"]
+        stats["statement_cache_evictions"] = statement_stats["evictions"]
+        stats["statement_cache_size"] = sum(len(cache) for cache in live)
+        checkouts = stats["checkouts"]
+        stats["avg_wait_time"] = stats["total_wait_time"] / checkouts if checkouts else 0.0
+        return stats
+
+    def close(self):
+        """Closes idle connections and stops handing out new ones. In-use connections close on release."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for entry in idle:
+            self._close_conn(entry.conn, entry.statements)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Returns the process-wide connection pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    get_backend(),
+                    min_size=int(get_setting("DB_POOL_MIN_SIZE", 1)),
+                    max_size=int(get_setting("DB_POOL_MAX_SIZE", 5)),
+                    idle_timeout=float(get_setting("DB_POOL_IDLE_TIMEOUT", 300)),
+                    acquire_timeout=float(get_setting("DB_POOL_ACQUIRE_TIMEOUT", 10)),
+                    health_check_interval=float(get_setting("DB_POOL_HEALTH_CHECK_INTERVAL", 30)),
+                    statement_cache_size=int(get_setting("DB_STATEMENT_CACHE_SIZE", 32)),
+                )
+                query_stats.slow_query_ms = float(get_setting("DB_SLOW_QUERY_MS", 500))
+                _pool.prefill()
+    return _pool
+
+def pooled_connection(timeout=None):
+    """Shortcut for get_pool().connection()."""
+    return get_pool().connection(timeout=timeout)
+
+def get_pool_stats():
+    """Pool counters (checkouts, wait time, in-use count, ...)."""
+    return get_pool().stats()
+
+def close_pool():
+    """Closes the process-wide pool. The next call to get_pool() builds a fresh one."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+
+def execute_query(conn, sql, params=None):
+    """
+    Executes a SQL query on the configured backend.
+    If it's a SELECT statement, returns a list of dictionaries.
+    If it's an INSERT/UPDATE/DELETE, returns True on success.
+    """
+    if not conn:
+        return None
+
+    # Pooled connections carry a prepared-statement cache; script connections don't
+    statements = _pool.statement_cache(conn) if _pool is not None else None
+    return get_backend().execute(conn, sql, params, statements=statements)
+
+class QueryCursor:
+    """
+    Streams a SELECT result as tuples sharing one column header.
+
+    Iterate it for one row at a time, or use chunks(n) for lists of up to n
+    rows when processing large result sets with bounded memory.
+    """
+
+    def __init__(self, columns, rows, close):
+        self.columns = columns
+        self.index = {name: i for i, name in enumerate(columns)}
+        self._rows = rows
+        self._close = close
+        self.closed = False
+
+    def __iter__(self):
+        return self._rows
+
+    def chunks(self, size):
+        while True:
+            chunk = list(islice(self._rows, size))
+            if not chunk:
+                return
+            yield chunk
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self._close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def iter_query(conn, sql, params=None):
+    """
+    Executes a SELECT on an open connection and returns a QueryCursor.
+    Close the cursor (or use it as a context manager) before reusing the connection.
+    """
+    statements = _pool.statement_cache(conn) if _pool is not None else None
+    return QueryCursor(*get_backend().open_cursor(conn, sql, params, statements=statements))
+
+@contextmanager
+def stream_query(sql, params=None):
+    """
+    Checks out a pooled connection for as long as the caller consumes the result.
+
+        with stream_query(sql, params) as cursor:
+            for chunk in cursor.chunks(1000):
+                ...
+    """
+    with pooled_connection() as conn:
+        if not conn:
+            raise Exception("Database connection failed")
+        with iter_query(conn, sql, params) as cursor:
+            yield cursor
+
+@contextmanager
+def transaction(conn):
+    """
+    Runs the enclosed statements as one unit of work: committed together,
+    or rolled back together if anything raises.
+    """
+    backend = get_backend()
+    backend.begin(conn)
+    try:
+        yield conn
+    except Exception:
+        backend.rollback(conn)
+        raise
+    else:
+        backend.commit(conn)
+
+# ===== CHANGE TRACKING =====
+# Every write to categories or transactions stamps the rows it touches with the
+# next sync_state sequence number, and deletes leave a tombstone, so read replicas
+# (utils/replica.py) can pull just what changed since their high-water mark.
+
+_local_change_seq = 0
+_local_change_lock = threading.Lock()
+
+def _next_change_seq(conn):
+    """
+    Takes the next change sequence number. Call inside transaction(conn): the row
+    lock on sync_state is held until commit, so sequence order is commit order and
+    a reader that has seen seq N has seen every change up to N.
+    """
+    sql = get_backend().update_returning("UPDATE sync_state SET seq = seq + 1 WHERE name = 'changes'", "seq")
+    rows = execute_query(conn, sql)
+    if not rows:
+        raise Exception("sync_state has no 'changes' row; run migrate_db.py")
+    return int(rows[0]['seq'])
+
+def _note_change(seq, months=()):
+    """
+    Remembers the newest change committed by this process, so replicas can catch up before serving it.
+    months: (user_id, 'YYYY-MM') pairs whose transactions changed; their cached reads go stale.
+    """
+    global _local_change_seq
+    with _local_change_lock:
+        _local_change_seq = max(_local_change_seq, seq)
+    if months:
+        data_versions.bump(months)
+
+def get_local_change_seq():
+    return _local_change_seq
+
+class DataVersions:
+    """
+    Version counters for cached reads (see utils/read_cache.py): one per
+    (user, month) of transactions, plus `transactions`, which goes up on any
+    transaction write. Categories are versioned by category_directory.version.
+    Writes bump only the months they touched, after commit.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._months = {}
+        self.transactions = 0
+
+    def month(self, user_id, month_key):
+        return self._months.get((user_id, month_key), 0)
+
+    def bump(self, months):
+        with self._lock:
+            for key in set(months):
+                self._months[key] = self._months.get(key, 0) + 1
+            self.transactions += 1
+
+data_versions = DataVersions()
+
+def get_data_version(month_name=None, user_id=DEFAULT_USER_ID):
+    """Counter that changes whenever the month's transactions do (any month if month_name is None)."""
+    if month_name is None:
+        return data_versions.transactions
+    return data_versions.month(user_id, month_name)
+
+def get_change_seq(conn):
+    """The newest committed change sequence number."""
+    rows = execute_query(conn, "SELECT seq FROM sync_state WHERE name = 'changes'")
+    return int(rows[0]['seq']) if rows else 0
+
+def get_tombstone_floor(conn):
+    """Tombstones below this change_seq have been pruned (0 if none ever were)."""
+    rows = execute_query(conn, "SELECT seq FROM sync_state WHERE name = 'tombstones_pruned'")
+    return int(rows[0]['seq']) if rows else 0
+
+def prune_tombstones(below_seq):
+    """
+    Deletes tombstones with change_seq below below_seq and returns how many.
+    The floor is kept in sync_state, so a replica whose high-water mark is
+    older than that copies everything again instead of missing deletes.
+    """
+    below_seq = int(below_seq)
+    with pooled_connection() as conn:
+        if not conn:
+            raise Exception("Database connection failed")
+        with transaction(conn):
+            count = int(execute_query(conn, "SELECT COUNT(*) AS n FROM tombstones WHERE change_seq < ?", (below_seq,))[0]['n'])
+            execute_query(conn, "DELETE FROM tombstones WHERE change_seq < ?", (below_seq,))
+            floor = get_tombstone_floor(conn)
+            if not execute_query(conn, "SELECT 1 FROM sync_state WHERE name = 'tombstones_pruned'"):
+                execute_query(conn, "INSERT INTO sync_state (name, seq) VALUES ('tombstones_pruned', ?)", (below_seq,))
+            elif below_seq > floor:
+                execute_query(conn, "UPDATE sync_state SET seq = ? WHERE name = 'tombstones_pruned'", (below_seq,))
+        return count
+
+def _fresh_replica():
+    """The local read replica (READ_REPLICA setting) if it is within its staleness bound, else None."""
+    from utils import replica
+    return replica.fresh_replica()
+
+# Rows per tombstone INSERT; 300 rows x 3 columns stays under SQLite's 999 parameter limit
+TOMBSTONE_BATCH_SIZE = 300
+
+def _add_tombstones(conn, table_name, row_ids, seq):
+    row_ids = list(row_ids)
+    for i in range(0, len(row_ids), TOMBSTONE_BATCH_SIZE):
+        batch = row_ids[i:i + TOMBSTONE_BATCH_SIZE]
+        values = ", ".join("(?, ?, ?)" for _ in batch)
+        sql = f"INSERT INTO tombstones (table_name, row_id, change_seq) VALUES {values}"
+        execute_query(conn, sql, [value for row_id in batch for value in (table_name, row_id, seq)])
+
 # ===== CATEGORY FUNCTIONS =====
 
+class CategoryDirectory:
+    """
+    In-process map of category name -> (id, planned_amount), shared by every session.
+
+    Loaded from the database once, then kept current by add_category,
+    update_category, delete_category and apply_category_changes. `version` goes up on every change so
+    callers can tell when their own copies are stale.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries = None  # name -> Category, ordered by name
+        self.version = 0
+
+    def _loaded_locked(self):
+        """
+        The name -> Category dict, loaded first if needed, or None if the
+        database is unreachable. Call with the lock held and read the entries
+        before releasing it: invalidate() may drop them from another thread.
+        """
+        if self._entries is not None:
+            return self._entries
+        replica = _fresh_replica()
+        if replica is not None:
+            rows = replica.get_categories()
+        else:
+            pool = get_pool()
+            conn = pool.acquire()
+            if not conn:
+                return None
+            try:
+                sql = "SELECT id, name, planned_amount FROM categories ORDER BY name"
+                rows = execute_query(conn, sql)
+            finally:
+                pool.release(conn)
+        self._entries = {r['name']: Category(r['id'], r['name'], r['planned_amount']) for r in rows}
+        self.version += 1
+        return self._entries
+
+    def _sort_locked(self):
+        self._entries = dict(sorted(self._entries.items()))
+
+    def list(self):
+        """All categories as Category records, ordered by name. Entries are shared; treat them as read-only."""
+        with self._lock:
+            entries = self._loaded_locked()
+            return list(entries.values()) if entries is not None else []
+
+    def ids_for(self, names):
+        """Maps each known name to its id. Unknown names are left out."""
+        with self._lock:
+            entries = self._loaded_locked()
+            if entries is None:
+                return {}
+            return {name: entries[name].id for name in names if name in entries}
+
+    def put(self, category_id, name, planned_amount):
+        with self._lock:
+            if self._entries is None:
+                return
+            self._entries[name] = Category(category_id, name, planned_amount)
+            self._sort_locked()
+            self.version += 1
+
+    def rename(self, old_name, new_name, planned_amount):
+        with self._lock:
+            if self._entries is None:
+                return
+            entry = self._entries.pop(old_name, None)
+            if entry is None:
+                # Changed behind our back; reload on next read
+                self._entries = None
+            else:
+                self._entries[new_name] = Category(entry.id, new_name, planned_amount)
+                self._sort_locked()
+            self.version += 1
+
+    def remove(self, name):
+        with self._lock:
+            if self._entries is None:
+                return
+            self._entries.pop(name, None)
+            self.version += 1
+
+    def apply(self, rows, deleted_ids):
+        """Replaces/adds these Category records and drops deleted ids, as one version bump."""
+        with self._lock:
+            if self._entries is None:
+                return
+            gone = set(deleted_ids) | {r.id for r in rows}
+            entries = {name: c for name, c in self._entries.items() if c.id not in gone}
+            entries.update((r.name, r) for r in rows)
+            self._entries = entries
+            self._sort_locked()
+            self.version += 1
+
+    def invalidate(self):
+        """Drops everything; the next read reloads from the database."""
+        with self._lock:
+            self._entries = None
+            self.version += 1
+
+category_directory = CategoryDirectory()
+
 def get_categories():
-    """Get all categories"""
-    conn = get_db_connection()
-    if not conn:
-        return []
-    
+    """Get all categories (served from the in-process category directory)"""
     try:
-        sql = "SELECT name, planned_amount FROM categories ORDER BY name"
-        results = execute_query(conn, sql)
-        return results
+        return category_directory.list()
     except Exception as e:
         print(f"Error getting categories: {e}")
         return []
-    finally:
-        if conn:
-            ibm_db.close(conn)
+
+def get_categories_version():
+    """Counter that changes whenever the category list does."""
+    return category_directory.version
+
+def refresh_categories():
+    """Forces the category directory to reload from the database on next use."""
+    category_directory.invalidate()
 
 def add_category(name, planned_amount):
     """Add a new category"""
-    conn = get_db_connection()
+    pool = get_pool()
+    conn = pool.acquire()
     if not conn:
         raise Exception("Database connection failed")
     
     try:
-        sql = "INSERT INTO categories (name, planned_amount) VALUES (?, ?)"
-        execute_query(conn, sql, (name, planned_amount))
+        sql = get_backend().returning_id("INSERT INTO categories (name, planned_amount, change_seq) VALUES (?, ?, ?)")
+        with transaction(conn):
+            seq = _next_change_seq(conn)
+            result = execute_query(conn, sql, (name, planned_amount, seq))
+        _note_change(seq)
+        category_directory.put(result[0]['id'], name, planned_amount)
     finally:
-        if conn:
-            ibm_db.close(conn)
+        pool.release(conn)
 
 def update_category(old_name, new_name, planned_amount):
     """Update a category"""
-    conn = get_db_connection()
+    pool = get_pool()
+    conn = pool.acquire()
     if not conn:
         raise Exception("Database connection failed")
     
     try:
-        sql = "UPDATE categories SET name = ?, planned_amount = ? WHERE name = ?"
-        execute_query(conn, sql, (new_name, planned_amount, old_name))
+        sql = "UPDATE categories SET name = ?, planned_amount = ?, change_seq = ? WHERE name = ?"
+        with transaction(conn):
+            seq = _next_change_seq(conn)
+            execute_query(conn, sql, (new_name, planned_amount, seq, old_name))
+        _note_change(seq)
+        category_directory.rename(old_name, new_name, planned_amount)
     finally:
-        if conn:
-            ibm_db.close(conn)
+        pool.release(conn)
 
 def delete_category(name):
     """Delete a category"""
-    conn = get_db_connection()
+    pool = get_pool()
+    conn = pool.acquire()
     if not conn:
         raise Exception("Database connection failed")
     
     try:
-        sql = "DELETE FROM categories WHERE name = ?"
-        execute_query(conn, sql, (name,))
+        with transaction(conn):
+            seq = _next_change_seq(conn)
+            rows = execute_query(conn, "SELECT id FROM categories WHERE name = ?", (name,))
+            execute_query(conn, "DELETE FROM categories WHERE name = ?", (name,))
+            _add_tombstones(conn, 'categories', [r['id'] for r in rows], seq)
+        _note_change(seq)
+        category_directory.remove(name)
+    finally:
+        pool.release(conn)
+
+def diff_categories(categories, rows):
+    """
+    The apply_category_changes dict that turns categories (Category records)
+    into rows: dicts with 'id' (None for a new category), 'name' and
+    'planned_amount', e.g. the rows of the edited category grid.
+    Categories missing from rows are deleted; unchanged ones are left out.
+    """
+    current = {c.id: c for c in categories}
+    changes = {'added': [], 'updated': [], 'deleted': []}
+    kept = set()
+    for row in rows:
+        name = (row['name'] or '').strip()
+        planned_amount = _to_amount(row['planned_amount'] or 0)
+        category = current.get(row['id'])
+        if category is None:
+            changes['added'].append({'name': name, 'planned_amount': planned_amount})
+            continue
+        kept.add(category.id)
+        if name != category.name or planned_amount != _to_amount(category.planned_amount):
+            changes['updated'].append({'id': category.id, 'name': name, 'planned_amount': planned_amount})
+    changes['deleted'] = [category_id for category_id in current if category_id not in kept]
+    return changes
+
+def _check_category_names(added, updated, deleted):
+    """Raises if the changes would leave a blank or duplicate category name."""
+    names = {c.id: c.name for c in category_directory.list()}
+    for category_id in deleted:
+        names.pop(category_id, None)
+    for change in updated:
+        names[change['id']] = change['name']
+    final = list(names.values()) + [change['name'] for change in added]
+    if any(not name for name in final):
+        raise Exception("Category names cannot be empty")
+    duplicates = sorted({name for name in final if final.count(name) > 1})
+    if duplicates:
+        raise Exception(f"Duplicate category names: {', '.join(duplicates)}")
+
+def _update_categories(conn, changes, seq):
+    """Sets name and planned_amount by id, one UPDATE per batch of rows."""
+    for i in range(0, len(changes), INSERT_BATCH_SIZE):
+        batch = changes[i:i + INSERT_BATCH_SIZE]
+        # Typed so DB2 can tell what the CASE results are
+        names = " ".join("WHEN ? THEN CAST(? AS VARCHAR(255))" for _ in batch)
+        amounts = " ".join("WHEN ? THEN CAST(? AS DECIMAL(10, 2))" for _ in batch)
+        placeholders = ", ".join("?" for _ in batch)
+        sql = f"""
+            UPDATE categories SET
+                name = CASE id {names} END,
+                planned_amount = CASE id {amounts} END,
+                change_seq = ?
+            WHERE id IN ({placeholders})
+        """
+        params = [value for c in batch for value in (c['id'], c['name'])]
+        params += [value for c in batch for value in (c['id'], c['planned_amount'])]
+        params += [seq] + [c['id'] for c in batch]
+        execute_query(conn, sql, params)
+
+def apply_category_changes(changes):
+    """
+    Applies a batch of category edits (see diff_categories) as one transaction:
+      changes['added']:   [{'name', 'planned_amount'}]
+      changes['updated']: [{'id', 'name', 'planned_amount'}]
+      changes['deleted']: [id]
+    Deletes go first, so a category can take over a deleted one's name. Either
+    every change is saved or none is; the category directory then takes them
+    all in one version bump. Returns the number of categories changed.
+    """
+    added = [dict(c, name=c['name'].strip(), planned_amount=_to_amount(c['planned_amount'])) for c in changes.get('added', ())]
+    updated = [dict(c, name=c['name'].strip(), planned_amount=_to_amount(c['planned_amount'])) for c in changes.get('updated', ())]
+    deleted = list(dict.fromkeys(changes.get('deleted', ())))
+    if not (added or updated or deleted):
+        return 0
+    _check_category_names(added, updated, deleted)
+
+    pool = get_pool()
+    conn = pool.acquire()
+    if not conn:
+        raise Exception("Database connection failed")
+
+    try:
+        with transaction(conn):
+            seq = _next_change_seq(conn)
+            for i in range(0, len(deleted), DELETE_BATCH_SIZE):
+                batch = deleted[i:i + DELETE_BATCH_SIZE]
+                placeholders = ", ".join("?" for _ in batch)
+                execute_query(conn, f"DELETE FROM categories WHERE id IN ({placeholders})", batch)
+            _add_tombstones(conn, 'categories', deleted, seq)
+
+            # The unique name index is checked row by row on SQLite, so renames
+            # that swap or shift names between categories go through a temporary name
+            current = {c.id: c.name for c in category_directory.list()}
+            taken = {current.get(c['id']) for c in updated}
+            if any(c['name'] in taken and c['name'] != current.get(c['id']) for c in updated):
+                _update_categories(conn, [dict(c, name=f"~renaming {c['id']}") for c in updated], seq)
+            _update_categories(conn, updated, seq)
+
+            for i in range(0, len(added), INSERT_BATCH_SIZE):
+                batch = added[i:i + INSERT_BATCH_SIZE]
+                values = ", ".join("(?, ?, ?)" for _ in batch)
+                sql = f"INSERT INTO categories (name, planned_amount, change_seq) VALUES {values}"
+                execute_query(conn, sql, [value for c in batch for value in (c['name'], c['planned_amount'], seq)])
+
+            # Read back what this change wrote (new ids included) for the directory
+            rows = execute_query(conn, "SELECT id, name, planned_amount FROM categories WHERE change_seq = ?", (seq,))
+        _note_change(seq)
+        category_directory.apply([Category(r['id'], r['name'], r['planned_amount']) for r in rows], deleted)
+        return len(added) + len(updated) + len(deleted)
     finally:
-        if conn:
-            ibm_db.close(conn)
+        pool.release(conn)
 
 # ===== TRANSACTION FUNCTIONS =====
 
-def add_transaction(category, amount, vendor, notes='', date=None):
-    """Add a transaction"""
-    conn = get_db_connection()
+# Rows per multi-row INSERT; 100 rows x 8 columns stays under SQLite's 999 parameter limit
+INSERT_BATCH_SIZE = 100
+# Ids per DELETE ... WHERE id IN (...)
+DELETE_BATCH_SIZE = 500
+
+def add_transaction(category, amount, vendor, notes='', date=None, write_behind=None):
+    """
+    Add a transaction.
+    In write-behind mode (the WRITE_BEHIND setting, or write_behind=True) the save is
+    journaled locally and returns at once; a background worker writes it to the database.
+    """
+    transaction = {
+        'category': category,
+        'amount': amount,
+        'vendor': vendor,
+        'notes': notes,
+        'date': date,
+    }
+    from utils import write_behind as wb
+    if write_behind or (write_behind is None and wb.enabled()):
+        wb.get_queue().submit([transaction])
+        return
+    add_transactions([transaction])
+
+def add_transactions(transactions, skip_duplicates=False):
+    """
+    Add several transactions at once.
+    transactions: list of dicts with 'category', 'amount', 'vendor' and optional 'notes' / 'date' / 'dedup_key'.
+    Category ids are resolved in one query and the rows go in with multi-row INSERTs
+    inside a single database transaction: either every row is saved or none is.
+    With skip_duplicates, rows whose dedup_key is already stored (or repeated in the
+    batch) are left out instead of failing on idx_transactions_dedup.
+    Returns the number of rows inserted.
+    """
+    if not transactions:
+        return 0
+
+    # Category ids come from the in-process directory; only hit the database
+    # if a name is unknown (e.g. added by another process). Resolved before
+    # taking a connection: a cold directory loads on a pooled connection of its own
+    names = list(dict.fromkeys(t['category'] for t in transactions))
+    category_ids = category_directory.ids_for(names)
+
+    pool = get_pool()
+    conn = pool.acquire()
     if not conn:
         raise Exception("Database connection failed")
-    
-    if date is None:
-        date = datetime.now()
-    
+
+    try:
+        missing = [name for name in names if name not in category_ids]
+        if missing:
+            placeholders = ", ".join("?" for _ in missing)
+            cat_sql = f"SELECT id, name FROM categories WHERE name IN ({placeholders})"
+            found = {r['name']: r['id'] for r in execute_query(conn, cat_sql, missing)}
+            if found:
+                category_directory.invalidate()
+            category_ids.update(found)
+            missing = [name for name in missing if name not in category_ids]
+        if missing:
+            raise Exception(f"Category '{missing[0]}' not found")
+
+        now = datetime.now()
+        with transaction(conn):
+            seq = _next_change_seq(conn)
+            existing = set()
+            if skip_duplicates:
+                keys = list({t['dedup_key'] for t in transactions if t.get('dedup_key')})
+                existing = _existing_dedup_keys(conn, keys)
+
+            rows = []
+            deltas = {}
+            for t in transactions:
+                dedup_key = t.get('dedup_key')
+                if skip_duplicates and dedup_key:
+                    if dedup_key in existing:
+                        continue
+                    existing.add(dedup_key)
+                timestamp = t.get('date')
+                if timestamp is None:
+                    timestamp = now
+                category_id = category_ids[t['category']]
+                amount = _to_amount(t['amount'])
+                rows.append((
+                    DEFAULT_USER_ID,
+                    category_id,
+                    amount,
+                    t['vendor'],
+                    t.get('notes') or '',
+                    timestamp,
+                    dedup_key,
+                    seq,
+                ))
+                _add_delta(deltas, DEFAULT_USER_ID, timestamp, category_id, amount, 1)
+
+            for i in range(0, len(rows), INSERT_BATCH_SIZE):
+                batch = rows[i:i + INSERT_BATCH_SIZE]
+                values = ", ".join("(?, ?, ?, ?, ?, ?, ?, ?)" for _ in batch)
+                sql = f"""
+                    INSERT INTO transactions (user_id, category_id, amount, vendor, notes, timestamp, dedup_key, change_seq)
+                    VALUES {values}
+                """
+                execute_query(conn, sql, [value for row in batch for value in row])
+            _apply_monthly_deltas(conn, deltas)
+        _note_change(seq, [(user_id, month_key) for user_id, month_key, _ in deltas])
+        return len(rows)
+    finally:
+        pool.release(conn)
+
+def _existing_dedup_keys(conn, keys):
+    """Which of these dedup keys are already stored (looked up through idx_transactions_dedup)."""
+    found = set()
+    for i in range(0, len(keys), 500):
+        chunk = keys[i:i + 500]
+        placeholders = ", ".join("?" for _ in chunk)
+        sql = f"SELECT dedup_key FROM transactions WHERE dedup_key IN ({placeholders})"
+        with iter_query(conn, sql, chunk) as cursor:
+            found.update(key for (key,) in cursor)
+    return found
+
+def find_saved_dedup_keys(keys):
+    """Which of these dedup keys are stored already, as a set (e.g. write-behind entries that have landed)."""
+    keys = list(keys)
+    if not keys:
+        return set()
+    with pooled_connection() as conn:
+        if not conn:
+            raise Exception("Database connection failed")
+        return _existing_dedup_keys(conn, keys)
+
+def get_categorization_rules():
+    """Rows of categorization_rules: vendor_pattern, keyword_pattern, category (name)."""
+    pool = get_pool()
+    conn = pool.acquire()
+    if not conn:
+        return []
+
+    try:
+        sql = """
+            SELECT r.vendor_pattern, r.keyword_pattern, c.name as category
+            FROM categorization_rules r
+            JOIN categories c ON r.category_id = c.id
+            ORDER BY r.id
+        """
+        return execute_query(conn, sql)
+    except Exception as e:
+        print(f"Error getting categorization rules: {e}")
+        return []
+    finally:
+        pool.release(conn)
+
+def get_vendor_categories():
+    """
+    The category each vendor has been filed under most often, as {vendor: category name}.
+    Used to categorize imported rows the way the user already does.
+    """
+    pool = get_pool()
+    conn = pool.acquire()
+    if not conn:
+        return {}
+
     try:
-        # Get category ID
-        cat_sql = "SELECT id FROM categories WHERE name = ?"
-        cat_result = execute_query(conn, cat_sql, (category,))
-        if not cat_result:
-            raise Exception(f"Category '{category}' not found")
-        category_id = cat_result[0]['id']
-        
-        # Insert transaction
         sql = """
-            INSERT INTO transactions (user_id, category_id, amount, vendor, notes, timestamp)
-            VALUES (?, ?, ?, ?, ?, ?)
+            SELECT t.vendor, c.name as category, COUNT(*) as uses
+            FROM transactions t
+            JOIN categories c ON t.category_id = c.id
+            WHERE t.user_id = ? AND t.vendor IS NOT NULL
+            GROUP BY t.vendor, c.name
         """
-        execute_query(conn, sql, (DEFAULT_USER_ID, category_id, amount, vendor, notes, date))
+        best = {}
+        with iter_query(conn, sql, (DEFAULT_USER_ID,)) as cursor:
+            for vendor, category, uses in cursor:
+                if vendor not in best or uses > best[vendor][1]:
+                    best[vendor] = (category, uses)
+        return {vendor: category for vendor, (category, _) in best.items()}
+    except Exception as e:
+        print(f"Error getting vendor categories: {e}")
+        return {}
+    finally:
+        pool.release(conn)
+
+# ===== MONTHLY TOTALS =====
+#
+# monthly_category_totals holds one row per (user, month, category) with the
+# sum and count of its transactions. Every write to transactions updates it in
+# the same database transaction, so month-level reads never scan raw rows.
+
+def _to_amount(value):
+    """Rounds an amount to cents as a Decimal, exactly as DECIMAL(10, 2) will store it."""
+    return Decimal(str(value)).quantize(CENT, rounding=ROUND_HALF_UP)
+
+def _add_delta(deltas, user_id, timestamp, category_id, amount, count):
+    key = (user_id, timestamp.strftime('%Y-%m'), category_id)
+    total, txn_count = deltas.get(key, (Decimal(0), 0))
+    deltas[key] = (total + amount, txn_count + count)
+
+def _apply_monthly_deltas(conn, deltas):
+    """
+    Adds per-(user, month, category) deltas to monthly_category_totals.
+    Must run inside the same transaction as the writes that produced them.
+    """
+    if not deltas:
+        return
+    backend = get_backend()
+    items = [(user_id, month_key, category_id, total, count)
+             for (user_id, month_key, category_id), (total, count) in deltas.items()]
+    for i in range(0, len(items), INSERT_BATCH_SIZE):
+        batch = items[i:i + INSERT_BATCH_SIZE]
+        execute_query(conn, backend.monthly_totals_upsert(len(batch)), [v for item in batch for v in item])
+    # Months/categories whose last transaction went away
+    for user_id in {item[0] for item in items}:
+        execute_query(conn, "DELETE FROM monthly_category_totals WHERE user_id = ? AND txn_count <= 0", (user_id,))
+
+def _monthly_totals_source_sql():
+    """The aggregate monthly_category_totals is supposed to equal."""
+    return f"""
+        SELECT user_id, {get_backend().month_key('timestamp')} as month_key, category_id,
+               SUM(amount) as total, COUNT(*) as txn_count
+        FROM transactions
+        WHERE category_id IS NOT NULL
+        GROUP BY user_id, {get_backend().month_key('timestamp')}, category_id
+    """
+
+def rebuild_monthly_totals():
+    """
+    Recomputes monthly_category_totals from transactions (backfill / repair).
+    Returns the number of summary rows written.
+    """
+    pool = get_pool()
+    conn = pool.acquire()
+    if not conn:
+        raise Exception("Database connection failed")
+
+    try:
+        with transaction(conn):
+            execute_query(conn, "DELETE FROM monthly_category_totals")
+            execute_query(conn, f"""
+                INSERT INTO monthly_category_totals (user_id, month_key, category_id, total, txn_count)
+                {_monthly_totals_source_sql()}
+            """)
+        rows = execute_query(conn, "SELECT COUNT(*) as n FROM monthly_category_totals")
+        return int(rows[0]['n'])
+    finally:
+        pool.release(conn)
+
+def verify_monthly_totals():
+    """
+    Compares monthly_category_totals against a fresh aggregate of transactions.
+    Returns a list of mismatches as (user_id, month_key, category_id, expected, actual);
+    empty means the summary is correct.
+    """
+    backend = get_backend()
+    pool = get_pool()
+    conn = pool.acquire()
+    if not conn:
+        raise Exception("Database connection failed")
+
+    try:
+        expected = {}
+        with iter_query(conn, f"""
+            SELECT user_id, month_key, category_id, {backend.cents('total')} as cents, txn_count
+            FROM ({_monthly_totals_source_sql()}) src
+        """) as cursor:
+            for user_id, month_key, category_id, cents, count in cursor:
+                expected[(user_id, month_key, category_id)] = (int(cents), int(count))
+        actual = {}
+        with iter_query(conn, f"""
+            SELECT user_id, month_key, category_id, {backend.cents('total')} as cents, txn_count
+            FROM monthly_category_totals
+        """) as cursor:
+            for user_id, month_key, category_id, cents, count in cursor:
+                actual[(user_id, month_key, category_id)] = (int(cents), int(count))
     finally:
-        if conn:
-            ibm_db.close(conn)
+        pool.release(conn)
+
+    mismatches = []
+    for key in sorted(set(expected) | set(actual), key=str):
+        if expected.get(key) != actual.get(key):
+            mismatches.append(key + (expected.get(key), actual.get(key)))
+    return mismatches
 
 def get_transactions(month_name=None):
     """
-    Get all transactions.
+    Get all transactions, as Transaction records (row['amount'] style access still works).
     month_name: 'YYYY-MM' string. If None, returns all (or maybe current month? Sheets returned all for a sheet).
+    Served from the local read replica when it is enabled and fresh.
     """
-    conn = get_db_connection()
+    replica = _fresh_replica()
+    if replica is not None:
+        return replica.get_transactions(month_name)
+
+    pool = get_pool()
+    conn = pool.acquire()
     if not conn:
         return []
     
@@ -226,35 +1941,264 @@ def get_transactions(month_name=None):
         params = [DEFAULT_USER_ID]
         
         if month_name:
-            # DB2 specific date filtering
-            # Assuming timestamp is standard SQL timestamp
-            sql += " AND VARCHAR_FORMAT(t.timestamp, 'YYYY-MM') = ?"
-            params.append(month_name)
+            # Half-open range on the raw column so idx_transactions_user_ts can be used
+            month_start, month_end = month_bounds(month_name)
+            sql += " AND t.timestamp >= ? AND t.timestamp < ?"
+            params.extend([month_start, month_end])
             
         sql += " ORDER BY t.timestamp DESC"
         
-        results = execute_query(conn, sql, params)
-        
-        # Format for app compatibility
-        formatted_results = []
-        for row in results:
-            formatted_results.append({
-                'date': row['timestamp'].strftime('%Y-%m-%d') if hasattr(row['timestamp'], 'strftime') else str(row['timestamp'])[:10],
-                'vendor': row['vendor'],
-                'category': row['category'],
-                'amount': float(row['amount']),
-                'notes': row['notes'],
-                'row': row['id'], # Using ID as row for compatibility with delete logic
-                'id': row['id']
-            })
-            
-        return formatted_results
+        # Transaction records straight from the row tuples
+        with iter_query(conn, sql, params) as cursor:
+            return [Transaction.from_row(*row) for row in cursor]
+    except Exception as e:
+        print(f"Error getting transactions: {e}")
+        return []
+    finally:
+        pool.release(conn)
+
+def get_transactions_frame(month_name=None, chunk_size=5000):
+    """
+    Columnar variant of get_transactions, for analysis over many rows.
+    Returns the frame of Transaction.to_frame, newest first, without building a
+    record per row: the cursor is read in chunks straight into column arrays
+    (int64 ids and cents summed in the database, datetime64 timestamps,
+    categorical vendor / category).
+    """
+    import numpy as np
+    import pandas as pd
+
+    backend = get_backend()
+    where, params = _month_filter(month_name)
+    sql = f"""
+        SELECT t.id, t.timestamp, t.vendor, c.name as category, {backend.cents('t.amount')} as amount_cents, t.notes
+        FROM transactions t
+        JOIN categories c ON t.category_id = c.id
+        {where}
+        ORDER BY t.timestamp DESC, t.id DESC
+    """
+
+    try:
+        ids, timestamps, vendors, categories, cents, notes = [], [], [], [], [], []
+        with stream_query(sql, params) as cursor:
+            for chunk in cursor.chunks(chunk_size):
+                c_id, c_ts, c_vendor, c_category, c_cents, c_notes = zip(*chunk)
+                ids.append(np.fromiter(c_id, dtype=np.int64, count=len(chunk)))
+                timestamps.append(np.asarray(pd.to_datetime(list(c_ts)), dtype='datetime64[ns]'))
+                vendors.extend(c_vendor)
+                categories.extend(c_category)
+                cents.append(np.fromiter(c_cents, dtype=np.int64, count=len(chunk)))
+                notes.extend(c_notes)
     except Exception as e:
         print(f"Error getting transactions: {e}")
+        return Transaction.to_frame([])
+
+    if not ids:
+        return Transaction.to_frame([])
+
+    amount_cents = np.concatenate(cents)
+    return pd.DataFrame({
+        'id': np.concatenate(ids),
+        'timestamp': np.concatenate(timestamps),
+        'vendor': pd.Categorical(vendors),
+        'category': pd.Categorical(categories),
+        'amount_cents': amount_cents,
+        'amount': amount_cents / 100.0,
+        'notes': np.array(notes, dtype=object),
+    })
+
+EXPORT_COLUMNS = ['id', 'timestamp', 'vendor', 'category', 'amount_cents', 'notes']
+
+def stream_transactions(month_name=None):
+    """
+    Context manager over every transaction (or one month's), oldest first, for exports.
+    Yields a QueryCursor of EXPORT_COLUMNS tuples; amount_cents is exact integer cents.
+    The pooled connection is held until the block exits, so consume it in chunks.
+    """
+    backend = get_backend()
+    where, params = _month_filter(month_name)
+    sql = f"""
+        SELECT t.id, t.timestamp, t.vendor, c.name as category, {backend.cents('t.amount')} as amount_cents, t.notes
+        FROM transactions t
+        JOIN categories c ON t.category_id = c.id
+        {where}
+        ORDER BY t.timestamp, t.id
+    """
+    return stream_query(sql, params)
+
+def list_transactions(month_name=None, after=None, limit=20):
+    """
+    One page of transactions, newest first, using keyset pagination.
+    after: (timestamp, id) of the last row of the previous page, or None for the first page.
+    Returns (rows, next_cursor); rows are Transaction records, next_cursor is None on the last page.
+    Each page is an index range scan of idx_transactions_user_ts_id, so it costs
+    O(limit) however far back it is.
+    """
+    backend = get_backend()
+    limit = int(limit)
+    where, params = _month_filter(month_name)
+    sql = f"""
+        SELECT t.id, t.timestamp, t.vendor, c.name as category, t.amount, t.notes
+        FROM transactions t
+        JOIN categories c ON t.category_id = c.id
+        {where}
+    """
+    if after is not None:
+        after_timestamp, after_id = after
+        # The plain upper bound is what the index can seek on; the OR only breaks ties
+        sql += " AND t.timestamp <= ? AND (t.timestamp < ? OR t.id < ?)"
+        params.extend([after_timestamp, after_timestamp, after_id])
+    # Ask for one extra row to learn whether another page exists
+    sql += f" ORDER BY t.timestamp DESC, t.id DESC {backend.limit(limit + 1)}"
+
+    pool = get_pool()
+    conn = pool.acquire()
+    if not conn:
+        return [], None
+
+    try:
+        with iter_query(conn, sql, params) as cursor:
+            rows = [Transaction.from_row(*row) for row in cursor]
+    except Exception as e:
+        print(f"Error listing transactions: {e}")
+        return [], None
+    finally:
+        pool.release(conn)
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, (rows[-1].timestamp, rows[-1].id)
+    return rows, None
+
+# ===== AGGREGATES =====
+
+def _month_filter(month_name, column='t.timestamp'):
+    """WHERE fragment and params for the user's rows, optionally limited to one month."""
+    sql = " WHERE t.user_id = ?"
+    params = [DEFAULT_USER_ID]
+    if month_name:
+        month_start, month_end = month_bounds(month_name)
+        sql += f" AND {column} >= ? AND {column} < ?"
+        params.extend([month_start, month_end])
+    return sql, params
+
+def _summary_filter(month_name):
+    """WHERE fragment and params over monthly_category_totals (aliased m)."""
+    sql = " WHERE m.user_id = ?"
+    params = [DEFAULT_USER_ID]
+    if month_name:
+        sql += " AND m.month_key = ?"
+        params.append(month_name)
+    return sql, params
+
+def get_category_totals(month_name=None):
+    """
+    Spending per category, read from monthly_category_totals.
+    Returns [{'category', 'amount_cents', 'amount', 'count'}] ordered by category name.
+    """
+    backend = get_backend()
+    where, params = _summary_filter(month_name)
+    sql = f"""
+        SELECT c.name as category, SUM({backend.cents('m.total')}) as amount_cents, SUM(m.txn_count) as txn_count
+        FROM monthly_category_totals m
+        JOIN categories c ON m.category_id = c.id
+        {where}
+        GROUP BY c.name
+        ORDER BY c.name
+    """
+    pool = get_pool()
+    conn = pool.acquire()
+    if not conn:
+        return []
+
+    try:
+        with iter_query(conn, sql, params) as cursor:
+            return [
+                {'category': category, 'amount_cents': int(cents), 'amount': int(cents) / 100, 'count': int(count)}
+                for category, cents, count in cursor
+            ]
+    except Exception as e:
+        print(f"Error getting category totals: {e}")
+        return []
+    finally:
+        pool.release(conn)
+
+def get_daily_totals(month_name=None):
+    """
+    Spending per day, summed in the database, with a running total.
+    Returns [{'date', 'amount_cents', 'amount', 'cumulative_cents', 'cumulative'}] in date order.
+    """
+    backend = get_backend()
+    where, params = _month_filter(month_name)
+    day = backend.day_key('t.timestamp')
+    sql = f"""
+        SELECT {day} as day, SUM({backend.cents('t.amount')}) as amount_cents
+        FROM transactions t
+        {where}
+        GROUP BY {day}
+        ORDER BY day
+    """
+    pool = get_pool()
+    conn = pool.acquire()
+    if not conn:
+        return []
+
+    try:
+        results = []
+        running = 0
+        with iter_query(conn, sql, params) as cursor:
+            for day_value, cents in cursor:
+                if isinstance(day_value, str):
+                    day_value = date.fromisoformat(day_value)
+                running += int(cents)
+                results.append({
+                    'date': day_value,
+                    'amount_cents': int(cents),
+                    'amount': int(cents) / 100,
+                    'cumulative_cents': running,
+                    'cumulative': running / 100,
+                })
+        return results
+    except Exception as e:
+        print(f"Error getting daily totals: {e}")
         return []
     finally:
-        if conn:
-            ibm_db.close(conn)
+        pool.release(conn)
+
+def get_month_summary(month_name=None):
+    """
+    Headline numbers for a month: spent (from monthly_category_totals) vs planned (from the category directory).
+    Returns {'month', 'count', 'spent_cents', 'spent', 'planned_cents', 'planned'}.
+    """
+    backend = get_backend()
+    where, params = _summary_filter(month_name)
+    sql = f"""
+        SELECT SUM(m.txn_count) as txn_count, SUM({backend.cents('m.total')}) as amount_cents
+        FROM monthly_category_totals m
+        {where}
+    """
+    count, spent_cents = 0, 0
+    pool = get_pool()
+    conn = pool.acquire()
+    if conn:
+        try:
+            with iter_query(conn, sql, params) as cursor:
+                for row_count, row_cents in cursor:
+                    count, spent_cents = int(row_count or 0), int(row_cents or 0)
+        except Exception as e:
+            print(f"Error getting month summary: {e}")
+        finally:
+            pool.release(conn)
+
+    planned_cents = sum(c.planned_cents for c in get_categories())
+    return {
+        'month': month_name,
+        'count': count,
+        'spent_cents': spent_cents,
+        'spent': spent_cents / 100,
+        'planned_cents': planned_cents,
+        'planned': planned_cents / 100,
+    }
 
 def delete_transaction(month_name, transaction_id):
     """
@@ -262,27 +2206,72 @@ def delete_transaction(month_name, transaction_id):
     month_name is ignored but kept for compatibility with sheets_client signature.
     transaction_id is the database ID.
     """
-    conn = get_db_connection()
+    delete_transactions([transaction_id])
+
+def delete_transactions(transaction_ids):
+    """
+    Deletes several transactions in one database transaction: all of them or none.
+    Each batch of DELETE_BATCH_SIZE ids is a single DELETE ... WHERE id IN (...)
+    that also returns the deleted rows (for the monthly totals and tombstones).
+    On top of that come the change seq, the totals upsert and cleanup, and the
+    tombstone inserts, so the statement count follows the number of batches,
+    not the number of rows.
+    Returns how many rows were deleted (ids that no longer exist are ignored).
+    """
+    ids = list(dict.fromkeys(int(i) for i in transaction_ids))
+    if not ids:
+        return 0
+
+    backend = get_backend()
+    pool = get_pool()
+    conn = pool.acquire()
     if not conn:
         raise Exception("Database connection failed")
     
     try:
-        sql = "DELETE FROM transactions WHERE id = ? AND user_id = ?"
-        execute_query(conn, sql, (transaction_id, DEFAULT_USER_ID))
+        deleted = []
+        with transaction(conn):
+            seq = _next_change_seq(conn)
+            deltas = {}
+            for i in range(0, len(ids), DELETE_BATCH_SIZE):
+                batch = ids[i:i + DELETE_BATCH_SIZE]
+                placeholders = ", ".join("?" for _ in batch)
+                sql = backend.delete_returning(
+                    f"DELETE FROM transactions WHERE id IN ({placeholders}) AND user_id = ?",
+                    "id, category_id, amount, timestamp",
+                )
+                rows = execute_query(conn, sql, batch + [DEFAULT_USER_ID])
+                for row in rows:
+                    if isinstance(row['timestamp'], str):
+                        # SQLite doesn't apply column type converters to RETURNING
+                        row['timestamp'] = datetime.fromisoformat(row['timestamp'])
+                    if row['category_id'] is not None:
+                        _add_delta(deltas, DEFAULT_USER_ID, row['timestamp'], row['category_id'],
+                                   -_to_amount(row['amount']), -1)
+                deleted.extend(rows)
+            _apply_monthly_deltas(conn, deltas)
+            _add_tombstones(conn, 'transactions', [row['id'] for row in deleted], seq)
+        _note_change(seq, [(DEFAULT_USER_ID, row['timestamp'].strftime('%Y-%m')) for row in deleted])
+        return len(deleted)
     finally:
-        if conn:
-            ibm_db.close(conn)
+        pool.release(conn)
 
 def get_available_months():
     """Get list of months that have transactions"""
-    conn = get_db_connection()
+    replica = _fresh_replica()
+    if replica is not None:
+        return replica.get_available_months()
+
+    pool = get_pool()
+    conn = pool.acquire()
     if not conn:
         return []
     
     try:
+        # monthly_category_totals has at most a few rows per month
         sql = """
-            SELECT DISTINCT VARCHAR_FORMAT(timestamp, 'YYYY-MM') as month_str
-            FROM transactions
+            SELECT DISTINCT month_key as month_str
+            FROM monthly_category_totals
             WHERE user_id = ?
             ORDER BY month_str DESC
         """
@@ -292,8 +2281,18 @@ def get_available_months():
         print(f"Error getting available months: {e}")
         return []
     finally:
-        if conn:
-            ibm_db.close(conn)
+        pool.release(conn)
+
+def month_bounds(month_name):
+    """
+    Turns 'YYYY-MM' into the half-open range [first day of month, first day of next month).
+    """
+    start = datetime.strptime(month_name, '%Y-%m')
+    if start.month == 12:
+        end = start.replace(year=start.year + 1, month=1)
+    else:
+        end = start.replace(month=start.month + 1)
+    return start, end
 
 def get_month_sheet_name(date=None):
     """
@@ -0,0 +1,44 @@
+"""
+Export transactions to CSV or Parquet, streaming rows in chunks.
+
+    python export_transactions.py transactions.csv
+    python export_transactions.py october.csv.gz --month 2026-10 --compression gzip
+    python export_transactions.py transactions.parquet --compression zstd
+"""
+import argparse
+import sys
+
+from utils.exporter import DEFAULT_CHUNK_SIZE, export_transactions
+
+def main():
+    parser = argparse.ArgumentParser(description="Export transactions to CSV or Parquet.")
+    parser.add_argument("path", help="output file")
+    parser.add_argument("--format", choices=["csv", "parquet"], help="output format (default: from the file extension)")
+    parser.add_argument("--month", help="only export this month (YYYY-MM)")
+    parser.add_argument("--compression", choices=["none", "gzip", "snappy", "zstd"],
+                        help="gzip for CSV; snappy (default), zstd or gzip for Parquet")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="rows fetched and written at a time")
+    args = parser.parse_args()
+
+    fmt = args.format or ("parquet" if args.path.endswith(".parquet") else "csv")
+    compression = args.compression
+    if compression is None:
+        compression = "gzip" if args.path.endswith(".gz") else ("snappy" if fmt == "parquet" else None)
+    elif compression == "none":
+        compression = None
+    if fmt == "csv" and compression not in (None, "gzip"):
+        parser.error("CSV exports only support gzip compression")
+
+    print(f"Exporting to {args.path}...")
+    rows = export_transactions(
+        args.path, fmt=fmt, month_name=args.month, compression=compression,
+        chunk_size=args.chunk_size, progress=lambda n: print(f"  {n} rows written"),
+    )
+    print(f"✓ Exported {rows} transaction(s).")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"✗ Export failed: {e}")
+        sys.exit(1)
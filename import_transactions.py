@@ -0,0 +1,46 @@
+"""
+Import a bank or card statement (CSV, OFX or QFX) into the transactions table.
+
+    python import_transactions.py statement.csv
+    python import_transactions.py card.csv --positive-expenses --default-category Shopping
+    python import_transactions.py checking.qfx
+
+Re-importing the same file (or an overlapping statement) skips lines that were already imported.
+"""
+import argparse
+import sys
+
+from utils.importer import detect_format, import_transactions, open_text
+
+def main():
+    parser = argparse.ArgumentParser(description="Import a CSV/OFX/QFX statement into the budget.")
+    parser.add_argument("path", help="statement file")
+    parser.add_argument("--format", choices=["csv", "ofx"], help="file format (default: from the file extension)")
+    parser.add_argument("--default-category", help="category for rows no rule or history matches (default: Miscellaneous)")
+    parser.add_argument("--positive-expenses", action="store_true",
+                        help="CSV 'Amount' lists charges as positive numbers (most card exports)")
+    parser.add_argument("--chunk-size", type=int, default=500, help="rows per insert transaction")
+    args = parser.parse_args()
+
+    def report(stats):
+        print(f"  {stats['read']} rows read, {stats['inserted']} imported, "
+              f"{stats['duplicates']} duplicates, {stats['skipped']} credits skipped, {stats['errors']} errors")
+
+    print(f"Importing {args.path}...")
+    with open(args.path, "rb") as f:
+        stats = import_transactions(
+            open_text(f),
+            fmt=args.format or detect_format(args.path),
+            default_category=args.default_category,
+            chunk_size=args.chunk_size,
+            positive_expenses=args.positive_expenses,
+            progress=report,
+        )
+
+    for message in stats['error_messages']:
+        print(f"  ✗ {message}")
+    print(f"✓ Imported {stats['inserted']} transaction(s).")
+    return stats['errors'] == 0
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
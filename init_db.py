@@ -1,19 +1,27 @@
-import ibm_db
-from db_client import get_db_connection, execute_query
+import re
+
+from db_client import get_db_connection, execute_query, get_backend
 
 def init_db():
+    backend = get_backend()
     conn = get_db_connection()
     if not conn:
-        print("Failed to connect to Db2.")
+        print(f"Failed to connect to {backend.label}.")
         return
 
-    print("Connected to Db2.")
+    print(f"Connected to {backend.label}.")
+
+    if backend.name == "sqlite":
+        # The embedded backend applies its schema on first connect
+        print(f"SQLite database ready ({backend.schema_file} applied on first connect).")
+        return
     
-    with open("schema.sql", "r") as f:
+    with open(backend.schema_file, "r") as f:
         sql_script = f.read()
 
-    # Split by semicolon, but be careful about semicolons in strings if any.
-    # For this simple schema, splitting by ';' is likely fine.
+    # Drop -- comments first, so a ';' in one can't split a statement.
+    # The schema has no ';' or '--' inside string literals, so a plain split is fine.
+    sql_script = re.sub(r"--[^\n]*", "", sql_script)
     statements = sql_script.split(';')
     
     for stmt in statements:
@@ -0,0 +1,203 @@
+"""
+Brings an existing database up to date with schema.sql / schema_sqlite.sql.
+
+Safe to run any number of times: every step checks the catalog first and is
+skipped when it is already in place (fresh installs from init_db.py already
+have everything).
+
+Usage:
+    python migrate_db.py                   # apply missing schema changes
+    python migrate_db.py --rebuild-totals  # recompute monthly_category_totals from transactions
+    python migrate_db.py --verify-totals   # check monthly_category_totals against transactions
+    python migrate_db.py --prune-tombstones SEQ  # delete delete-markers older than change seq SEQ
+"""
+import sys
+
+from db_client import (
+    get_db_connection, execute_query, get_backend,
+    rebuild_monthly_totals, verify_monthly_totals, prune_tombstones
+)
+
+MONTHLY_TOTALS_DDL = """
+CREATE TABLE monthly_category_totals (
+  user_id VARCHAR(36) NOT NULL,
+  month_key CHAR(7) NOT NULL,
+  category_id INTEGER NOT NULL,
+  total DECIMAL(12, 2) NOT NULL DEFAULT 0,
+  txn_count INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (user_id, month_key, category_id)
+)
+"""
+
+SYNC_STATE_DDL = """
+CREATE TABLE sync_state (
+  name VARCHAR(32) NOT NULL PRIMARY KEY,
+  seq BIGINT NOT NULL DEFAULT 0
+)
+"""
+
+TOMBSTONES_DDL = """
+CREATE TABLE tombstones (
+  table_name VARCHAR(32) NOT NULL,
+  row_id INTEGER NOT NULL,
+  change_seq BIGINT NOT NULL
+)
+"""
+
+def seed_sync_state():
+    """Adds the 'changes' sequence row if it is missing. Returns whether it was added."""
+    conn = get_db_connection()
+    if not conn:
+        raise Exception("Database connection failed")
+    try:
+        if execute_query(conn, "SELECT 1 FROM sync_state WHERE name = 'changes'"):
+            return False
+        execute_query(conn, "INSERT INTO sync_state (name, seq) VALUES ('changes', 0)")
+        return True
+    finally:
+        get_backend().close(conn)
+
+# (kind, object name, DDL). DDL may be a dict keyed by backend name when dialects differ.
+MIGRATIONS = [
+    ("index", "idx_transactions_user_ts",
+     "CREATE INDEX idx_transactions_user_ts ON transactions (user_id, timestamp)"),
+    ("index", "idx_transactions_user_ts_id",
+     "CREATE INDEX idx_transactions_user_ts_id ON transactions (user_id, timestamp, id)"),
+    ("index", "idx_transactions_category",
+     "CREATE INDEX idx_transactions_category ON transactions (category_id)"),
+    ("index", "idx_categories_name",
+     "CREATE UNIQUE INDEX idx_categories_name ON categories (name)"),
+    ("table", "monthly_category_totals", MONTHLY_TOTALS_DDL),
+    ("column", "transactions.dedup_key",
+     "ALTER TABLE transactions ADD COLUMN dedup_key VARCHAR(64)"),
+    ("index", "idx_transactions_dedup", {
+        "db2": "CREATE UNIQUE INDEX idx_transactions_dedup ON transactions (dedup_key) EXCLUDE NULL KEYS",
+        "sqlite": "CREATE UNIQUE INDEX idx_transactions_dedup ON transactions (dedup_key)",
+    }),
+    ("table", "sync_state", SYNC_STATE_DDL),
+    ("table", "tombstones", TOMBSTONES_DDL),
+    ("column", "categories.change_seq",
+     "ALTER TABLE categories ADD COLUMN change_seq BIGINT"),
+    ("column", "transactions.change_seq",
+     "ALTER TABLE transactions ADD COLUMN change_seq BIGINT"),
+    ("index", "idx_transactions_change_seq",
+     "CREATE INDEX idx_transactions_change_seq ON transactions (change_seq)"),
+    ("index", "idx_tombstones_seq",
+     "CREATE INDEX idx_tombstones_seq ON tombstones (change_seq)"),
+]
+
+# Run right after the named object is created, to fill it from existing data:
+# (backfill, how to finish the job by hand if it fails, since re-running skips it)
+BACKFILLS = {
+    "monthly_category_totals": (rebuild_monthly_totals, "Run `python migrate_db.py --rebuild-totals` once the cause is fixed."),
+}
+
+# Run on every migration after the schema steps; each checks for itself whether there is anything to do.
+# Without the 'changes' row every write fails (db_client._next_change_seq).
+SEEDS = [
+    ("sync_state 'changes' row", seed_sync_state),
+]
+
+def is_applied(backend, conn, kind, name):
+    if kind == "index":
+        return backend.index_exists(conn, name)
+    if kind == "table":
+        return backend.table_exists(conn, name)
+    if kind == "column":
+        table, column = name.split(".")
+        return backend.column_exists(conn, table, column)
+    raise ValueError(f"Unknown migration kind '{kind}'")
+
+def migrate():
+    backend = get_backend()
+    conn = get_db_connection()
+    if not conn:
+        print(f"Failed to connect to {backend.label}.")
+        return False
+
+    print(f"Connected to {backend.label}.")
+    failed = 0
+    created = []
+    try:
+        for kind, name, ddl in MIGRATIONS:
+            if is_applied(backend, conn, kind, name):
+                print(f"✓ {kind} {name} already present")
+                continue
+
+            if isinstance(ddl, dict):
+                ddl = ddl[backend.name]
+            print(f"Applying {kind} {name}...")
+            try:
+                execute_query(conn, ddl)
+                created.append(name)
+                print(f"✓ {kind} {name} created")
+            except Exception as e:
+                failed += 1
+                print(f"✗ {kind} {name} failed: {e}")
+                if name == "idx_categories_name":
+                    print("  Category names must be unique; rename or merge duplicates and re-run.")
+    finally:
+        backend.close(conn)
+
+    for name in created:
+        if name in BACKFILLS:
+            backfill, remedy = BACKFILLS[name]
+            print(f"Backfilling {name}...")
+            try:
+                backfill()
+                print(f"✓ {name} backfilled")
+            except Exception as e:
+                failed += 1
+                print(f"✗ {name} backfill failed: {e}")
+                print(f"  {remedy}")
+
+    for name, seed in SEEDS:
+        try:
+            if seed():
+                print(f"✓ {name} added")
+            else:
+                print(f"✓ {name} already present")
+        except Exception as e:
+            failed += 1
+            print(f"✗ {name} failed: {e}")
+
+    if failed:
+        print(f"\nMigration finished with {failed} failed step(s).")
+        return False
+    print("\nDatabase is up to date.")
+    return True
+
+def rebuild_totals():
+    rows = rebuild_monthly_totals()
+    print(f"✓ Rebuilt monthly_category_totals ({rows} rows).")
+
+def verify_totals():
+    mismatches = verify_monthly_totals()
+    if not mismatches:
+        print("✓ monthly_category_totals matches transactions.")
+        return True
+    print(f"✗ {len(mismatches)} mismatched row(s) (user, month, category, expected (cents, count), actual):")
+    for mismatch in mismatches[:50]:
+        print(f"  {mismatch}")
+    print("Run `python migrate_db.py --rebuild-totals` to repair.")
+    return False
+
+def prune(below_seq):
+    removed = prune_tombstones(below_seq)
+    print(f"✓ Pruned {removed} tombstone(s) below change seq {below_seq}.")
+    print("  Read replicas that had not synced past it will copy everything on their next sync.")
+
+if __name__ == "__main__":
+    if "--prune-tombstones" in sys.argv:
+        i = sys.argv.index("--prune-tombstones")
+        if i + 1 >= len(sys.argv) or not sys.argv[i + 1].isdigit():
+            print("Usage: python migrate_db.py --prune-tombstones SEQ")
+            sys.exit(2)
+        prune(int(sys.argv[i + 1]))
+    elif "--rebuild-totals" in sys.argv:
+        rebuild_totals()
+    elif "--verify-totals" in sys.argv:
+        ok = verify_totals()
+        sys.exit(0 if ok else 1)
+    else:
+        migrate()
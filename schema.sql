@@ -12,6 +12,7 @@ CREATE TABLE categories (
   name VARCHAR(255),
   planned_amount DECIMAL(10, 2),
   created_at TIMESTAMP DEFAULT CURRENT TIMESTAMP,
+  change_seq BIGINT,
   PRIMARY KEY (id)
 );
 
@@ -24,6 +25,8 @@ CREATE TABLE transactions (
   vendor VARCHAR(255),
   notes VARCHAR(1000),
   timestamp TIMESTAMP DEFAULT CURRENT TIMESTAMP,
+  dedup_key VARCHAR(64),
+  change_seq BIGINT,
   PRIMARY KEY (id),
   FOREIGN KEY (user_id) REFERENCES users(id),
   FOREIGN KEY (category_id) REFERENCES categories(id)
@@ -39,6 +42,46 @@ CREATE TABLE categorization_rules (
   FOREIGN KEY (category_id) REFERENCES categories(id)
 );
 
+-- Monthly totals per category, maintained by db_client alongside every
+-- transaction write (rebuild with: python migrate_db.py --rebuild-totals)
+CREATE TABLE monthly_category_totals (
+  user_id VARCHAR(36) NOT NULL,
+  month_key CHAR(7) NOT NULL,
+  category_id INTEGER NOT NULL,
+  total DECIMAL(12, 2) NOT NULL DEFAULT 0,
+  txn_count INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (user_id, month_key, category_id)
+);
+
+-- Change tracking for read replicas: every write to categories/transactions
+-- takes the next seq and stamps it on the rows it touches, and deletes leave a tombstone
+CREATE TABLE sync_state (
+  name VARCHAR(32) NOT NULL PRIMARY KEY,
+  seq BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE tombstones (
+  table_name VARCHAR(32) NOT NULL,
+  row_id INTEGER NOT NULL,
+  change_seq BIGINT NOT NULL
+);
+
+INSERT INTO sync_state (name, seq) VALUES ('changes', 0);
+
+-- Indexes
+-- Month views filter on (user_id, timestamp) ranges, category lookups go by name
+CREATE INDEX idx_transactions_user_ts ON transactions (user_id, timestamp);
+-- History pages seek on (timestamp, id) keys, newest first
+CREATE INDEX idx_transactions_user_ts_id ON transactions (user_id, timestamp, id);
+CREATE INDEX idx_transactions_category ON transactions (category_id);
+CREATE UNIQUE INDEX idx_categories_name ON categories (name);
+-- Content hash of imported rows, so re-importing a statement skips what is already there
+CREATE UNIQUE INDEX idx_transactions_dedup ON transactions (dedup_key) EXCLUDE NULL KEYS;
+
+-- Replicas pull rows changed since their high-water mark
+CREATE INDEX idx_transactions_change_seq ON transactions (change_seq);
+CREATE INDEX idx_tombstones_seq ON tombstones (change_seq);
+
 -- Seed Categories (Default budget categories for new installations)
 INSERT INTO categories (name, planned_amount) VALUES
 ('Housing', 3000.00),
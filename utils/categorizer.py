@@ -1,9 +1,5 @@
 import os
 import json
-from ibm_watsonx_ai.foundation_models import Model
-from dotenv import load_dotenv
-
-load_dotenv()
 
 def categorize_expense(text: str, categories: list):
     """
@@ -21,12 +17,20 @@ def categorize_expense(text: str, categories: list):
         project_id = st.secrets.get("WATSONX_PROJECT_ID")
     except:
         # Fall back to environment variables (for local development)
+        from dotenv import load_dotenv
+        load_dotenv()
         api_key = os.environ.get("WATSONX_API_KEY")
         project_id = os.environ.get("WATSONX_PROJECT_ID")
     
     if not api_key or not project_id:
         return {"error": "Missing Watsonx credentials"}
 
+    # The SDK is slow to import; only AI input pays for it
+    try:
+        from ibm_watsonx_ai.foundation_models import Model
+    except ImportError:
+        return {"error": "ibm-watsonx-ai is not installed"}
+
     model_id = "meta-llama/llama-3-3-70b-instruct"
     
     parameters = {
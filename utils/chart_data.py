@@ -0,0 +1,67 @@
+"""
+Data preparation for the dashboard charts, kept apart from plotting (no
+plotly import) and vectorized: one groupby/reindex per chart, never a pass
+over the rows per category. Inputs are left untouched.
+Amounts are summed as int64 cents; float dollars are added for the axes.
+"""
+import numpy as np
+import pandas as pd
+
+from utils.money import to_cents
+
+def _cents(df):
+    """The frame's amounts as int64 cents: amount_cents if present, else float dollars in 'amount'."""
+    if 'amount_cents' in df:
+        return df['amount_cents'].to_numpy(dtype=np.int64)
+    return np.rint(df['amount'].to_numpy(dtype=float) * 100).astype(np.int64)
+
+def planned_vs_actual(categories, spending):
+    """
+    Planned and actual amounts for each category, in the order given.
+    categories: Category records (or dicts) with 'name' and 'planned_amount'.
+    spending: frame with 'category' and 'amount_cents' (or 'amount'); one row per
+    category (category totals) or per transaction, either works.
+    Returns a frame with category, planned_cents, actual_cents, planned, actual.
+    Spending in categories not listed is left out; unspent categories show 0.
+    """
+    names = [c['name'] for c in categories]
+    planned = np.fromiter((to_cents(c['planned_amount']) for c in categories), dtype=np.int64, count=len(names))
+
+    actual = np.zeros(len(names), dtype=np.int64)
+    if len(spending):
+        cents = pd.Series(_cents(spending), index=spending.index)
+        totals = cents.groupby(spending['category'], sort=False, observed=True).sum()
+        # Plain labels, so names outside a categorical's categories still reindex (to 0)
+        totals.index = totals.index.astype(object)
+        actual = totals.reindex(names, fill_value=0).to_numpy(dtype=np.int64)
+
+    return pd.DataFrame({
+        'category': names,
+        'planned_cents': planned,
+        'actual_cents': actual,
+        'planned': planned / 100.0,
+        'actual': actual / 100.0,
+    })
+
+def daily_cumulative(df, column='timestamp'):
+    """
+    Spending per day and running total, in date order, from transaction rows.
+    df: frame with a timestamp column and 'amount_cents' (or 'amount'). It is
+    neither modified nor sorted; days are grouped straight from the column.
+    Returns the columns of db_client.get_daily_totals: date, amount_cents,
+    amount, cumulative_cents, cumulative.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=['date', 'amount_cents', 'amount', 'cumulative_cents', 'cumulative'])
+
+    days = pd.to_datetime(df[column]).dt.normalize().to_numpy()
+    daily = pd.Series(_cents(df)).groupby(days).sum()
+    amount_cents = daily.to_numpy(dtype=np.int64)
+    cumulative_cents = amount_cents.cumsum()
+    return pd.DataFrame({
+        'date': daily.index.date,
+        'amount_cents': amount_cents,
+        'amount': amount_cents / 100.0,
+        'cumulative_cents': cumulative_cents,
+        'cumulative': cumulative_cents / 100.0,
+    })
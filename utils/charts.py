@@ -1,26 +1,16 @@
 import plotly.graph_objects as go
 import plotly.express as px
-import pandas as pd
+from utils.chart_data import planned_vs_actual, daily_cumulative
 
 def category_progress_chart(categories_data, category_spending):
     """
     Create a grouped bar chart showing planned vs actual for all categories
     """
-    import plotly.graph_objects as go
-    
-    # Prepare data
-    category_names = []
-    planned_amounts = []
-    actual_amounts = []
-    
-    for cat in categories_data:
-        cat_name = cat['name']
-        planned = float(cat['planned_amount'])
-        actual = category_spending[category_spending['category'] == cat_name]['amount'].sum() if cat_name in category_spending['category'].values else 0
-        
-        category_names.append(cat_name)
-        planned_amounts.append(planned)
-        actual_amounts.append(actual)
+    # Summed in cents; dollars only for the axis
+    data = planned_vs_actual(categories_data, category_spending)
+    category_names = data['category']
+    planned_amounts = data['planned']
+    actual_amounts = data['actual']
     
     # Create grouped horizontal bar chart
     fig = go.Figure(data=[
@@ -82,20 +72,17 @@ def pie_chart(df):
 def daily_spending(df):
     """
     Creates a line chart for daily cumulative spending for the current month.
-    Expects df to have 'timestamp' and 'amount' columns.
+    Expects df to have 'timestamp' and 'amount' (or 'amount_cents') columns; df is not modified.
     """
-    if df.empty:
+    return cumulative_spending_chart(daily_cumulative(df))
+
+def cumulative_spending_chart(daily):
+    """
+    Line chart of cumulative spending from pre-aggregated daily totals.
+    Expects 'date' and 'cumulative' columns (see db_client.get_daily_totals).
+    """
+    if daily.empty:
         return go.Figure()
-    
-    # Ensure timestamp is datetime
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-    
-    # Sort by date
-    df = df.sort_values('timestamp')
-    
-    # Group by day and sum
-    daily = df.groupby(df['timestamp'].dt.date)['amount'].sum().reset_index()
-    daily['cumulative'] = daily['amount'].cumsum()
-    
-    fig = px.line(daily, x='timestamp', y='cumulative', title='Cumulative Daily Spending', markers=True)
+
+    fig = px.line(daily, x='date', y='cumulative', title='Cumulative Daily Spending', markers=True)
     return fig
@@ -0,0 +1,188 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import db_client
+from utils import read_cache, write_behind
+
+# Shared by every session, so the number of queries in flight stays bounded
+# (keep it at or below DB_POOL_MAX_SIZE)
+_executor = ThreadPoolExecutor(
+    max_workers=int(db_client.get_setting("DATA_LOADER_WORKERS", 4)),
+    thread_name_prefix="data-loader",
+)
+
+DEFAULT_TIMEOUT = float(db_client.get_setting("DATA_LOADER_TIMEOUT", 15))
+
+# Loads that a save lands in the middle of are retried this many times in all
+MAX_LOAD_ATTEMPTS = 3
+
+def _month_tasks(month_name):
+    return {
+        'summary': (read_cache.get_month_summary, (month_name,), None),
+        'category_totals': (read_cache.get_category_totals, (month_name,), []),
+        'daily_totals': (read_cache.get_daily_totals, (month_name,), []),
+        'transactions': (read_cache.get_transactions, (month_name,), []),
+    }
+
+def _data_version(month_name):
+    """What the month's data was loaded at: callers holding derived state compare it to tell when to rebuild."""
+    return (db_client.get_data_version(month_name), db_client.get_categories_version())
+
+def _run(tasks, timeout):
+    """
+    Starts every task at once and waits for all of them, up to timeout seconds in total.
+    Returns (results, errors); a task that failed or timed out gets its default value
+    and an entry in errors.
+    """
+    futures = {name: _executor.submit(fn, *args) for name, (fn, args, _) in tasks.items()}
+    done, _ = wait(futures.values(), timeout=timeout)
+
+    results, errors = {}, {}
+    for name, future in futures.items():
+        default = tasks[name][2]
+        if future not in done:
+            future.cancel()
+            errors[name] = f"timed out after {timeout:.0f}s"
+            results[name] = default
+            continue
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            errors[name] = str(e)
+            results[name] = default
+    return results, errors
+
+def fold_rows(data, month_name, added=(), removed=()):
+    """
+    Adjusts freshly loaded data for rows the database doesn't reflect yet.
+    added rows (shaped like write_behind.pending_transactions rows) count in and
+    lead the transaction list; removed rows (get_transactions records) count out
+    and drop from it. Loaded values may be shared through the read cache, so
+    everything touched is copied, never changed in place.
+    """
+    if added and 'available_months' in data:
+        months = set(data['available_months']) | {r['timestamp'].strftime('%Y-%m') for r in added}
+        data['available_months'] = sorted(months, reverse=True)
+
+    if 'summary' not in data:
+        return data
+    added = [r for r in added if r['timestamp'].strftime('%Y-%m') == month_name]
+    removed = [r for r in removed if r['timestamp'].strftime('%Y-%m') == month_name]
+    if not added and not removed:
+        return data
+    changes = [(r, 1) for r in added] + [(r, -1) for r in removed]
+
+    summary = data['summary']
+    if summary is not None:
+        summary = dict(summary)
+        summary['count'] += len(added) - len(removed)
+        summary['spent_cents'] += sum(sign * r['amount_cents'] for r, sign in changes)
+        summary['spent'] = summary['spent_cents'] / 100
+        data['summary'] = summary
+
+    totals = {row['category']: dict(row) for row in data['category_totals']}
+    for r, sign in changes:
+        row = totals.setdefault(r['category'], {'category': r['category'], 'amount_cents': 0, 'amount': 0.0, 'count': 0})
+        row['amount_cents'] += sign * r['amount_cents']
+        row['amount'] = row['amount_cents'] / 100
+        row['count'] += sign
+    data['category_totals'] = [totals[name] for name in sorted(totals) if totals[name]['count'] > 0]
+
+    days = {row['date']: row['amount_cents'] for row in data['daily_totals']}
+    for r, sign in changes:
+        day = r['timestamp'].date()
+        days[day] = days.get(day, 0) + sign * r['amount_cents']
+    emptied = {r['timestamp'].date() for r in removed}
+    running = 0
+    daily = []
+    for day in sorted(days):
+        if day in emptied and days[day] == 0:
+            continue
+        running += days[day]
+        daily.append({'date': day, 'amount_cents': days[day], 'amount': days[day] / 100,
+                      'cumulative_cents': running, 'cumulative': running / 100})
+    data['daily_totals'] = daily
+
+    # Unsaved rows lead the month's transactions
+    removed_ids = {r['id'] for r in removed}
+    data['transactions'] = added + [row for row in data['transactions'] if row['id'] not in removed_ids]
+    return data
+
+def _load(tasks, month_name, timeout):
+    """
+    Runs tasks together with a snapshot of the write-behind journal that agrees
+    with them. Returns (results, errors, pending rows, data version loaded at).
+
+    The journal is read before the database, and which of its entries are
+    already stored is looked up alongside the other reads: those are counted by
+    the database and dropped here, the rest get folded in. A flush that commits
+    while the reads run could be seen by some of them and not others, so if the
+    data version moves during the load, it is retried.
+    """
+    for _ in range(MAX_LOAD_ATTEMPTS):
+        version = db_client.get_data_version()
+        data_version = _data_version(month_name)
+        pending = write_behind.pending_transactions()
+        keys = [r['dedup_key'] for r in pending if not r['failed']]
+        run = dict(tasks)
+        if keys:
+            run['saved_keys'] = (db_client.find_saved_dedup_keys, (keys,), set())
+        results, errors = _run(run, timeout)
+        saved = results.pop('saved_keys', set())
+        errors.pop('saved_keys', None)
+        if db_client.get_data_version() == version:
+            break
+    pending = [r for r in pending if r['dedup_key'] not in saved]
+    return results, errors, pending, data_version
+
+def _merge_pending(data, month_name, pending, writes=None):
+    """
+    Folds saves still waiting in the write-behind journal (pending, from _load),
+    and this session's in-flight optimistic writes (utils/optimistic.py), into
+    freshly loaded data, so a change shows up on the dashboard before it reaches
+    the database. Parked saves (failed for good until retried) are listed but
+    not counted: they may never be saved, so they stay out of the totals.
+    """
+    saving = [r for r in pending if not r['failed']]
+    failed = [r for r in pending if r['failed'] and r['timestamp'].strftime('%Y-%m') == month_name]
+    added, removed = writes.overlay() if writes is not None else ([], [])
+    data['pending_version'] = (
+        write_behind.get_queue().version if write_behind.enabled() else 0,
+        writes.version if writes is not None else 0,
+    )
+    data = fold_rows(data, month_name, saving + added, removed)
+    if failed and 'transactions' in data:
+        data['transactions'] = failed + data['transactions']
+    return data
+
+def load_snapshot(month_name, include_month_data=True, timeout=None, writes=None):
+    """
+    Loads what a page render needs in parallel and returns one combined dict:
+      available_months, categories, and (if include_month_data) summary,
+      category_totals, daily_totals and transactions (the month's, newest first),
+    plus 'errors' mapping any failed part to its message.
+    writes: the session's optimistic.WriteTracker, whose in-flight changes are folded in.
+    First paint waits for the slowest query instead of the sum of all of them,
+    and reads go through utils/read_cache, so months nobody wrote to come from memory.
+    """
+    timeout = DEFAULT_TIMEOUT if timeout is None else timeout
+    tasks = {
+        'available_months': (read_cache.get_available_months, (), []),
+        'categories': (db_client.get_categories, (), []),
+    }
+    if include_month_data:
+        tasks.update(_month_tasks(month_name))
+
+    snapshot, errors, pending, data_version = _load(tasks, month_name, timeout)
+    snapshot['month'] = month_name if include_month_data else None
+    snapshot['data_version'] = data_version if include_month_data else None
+    snapshot['errors'] = errors
+    return _merge_pending(snapshot, month_name, pending, writes)
+
+def load_month_data(month_name, timeout=None, writes=None):
+    """Refetches only the month-dependent parts of a snapshot, in parallel."""
+    timeout = DEFAULT_TIMEOUT if timeout is None else timeout
+    data, errors, pending, data_version = _load(_month_tasks(month_name), month_name, timeout)
+    data['month'] = month_name
+    data['data_version'] = data_version
+    data['errors'] = errors
+    return _merge_pending(data, month_name, pending, writes)
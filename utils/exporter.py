@@ -0,0 +1,163 @@
+import csv
+import gzip
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import db_client
+from utils.money import cents_to_decimal, format_cents
+
+FORMATS = ['csv', 'parquet']
+CSV_COMPRESSION = [None, 'gzip']
+PARQUET_COMPRESSION = ['snappy', 'zstd', 'gzip', None]
+DEFAULT_CHUNK_SIZE = 5000
+
+EXPORT_PREFIX = "budget-export-"
+# Exports never downloaded (the session ended first) are swept up after this long
+STALE_EXPORT_SECONDS = 24 * 3600
+
+HEADER = ['id', 'timestamp', 'vendor', 'category', 'amount', 'notes']
+
+# Exports run here so a large one never blocks a Streamlit script run
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="exporter")
+
+def file_extension(fmt, compression=None):
+    if fmt == 'csv':
+        return '.csv.gz' if compression == 'gzip' else '.csv'
+    return '.parquet'
+
+def _write_csv(cursor, path, chunk_size, compression, progress):
+    opener = gzip.open if compression == 'gzip' else open
+    rows_written = 0
+    with opener(path, 'wt', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for chunk in cursor.chunks(chunk_size):
+            writer.writerows(
+                (row_id, timestamp, vendor, category, format_cents(cents), notes or '')
+                for row_id, timestamp, vendor, category, cents, notes in chunk
+            )
+            rows_written += len(chunk)
+            if progress:
+                progress(rows_written)
+    return rows_written
+
+def _write_parquet(cursor, path, chunk_size, compression, progress):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise Exception("Parquet export needs pyarrow (pip install pyarrow)")
+
+    schema = pa.schema([
+        ('id', pa.int64()),
+        ('timestamp', pa.timestamp('us')),
+        ('vendor', pa.string()),
+        ('category', pa.string()),
+        ('amount', pa.decimal128(12, 2)),
+        ('notes', pa.string()),
+    ])
+    rows_written = 0
+    # One row group per chunk; only the current chunk is ever in memory
+    with pq.ParquetWriter(path, schema, compression=compression or 'none') as writer:
+        for chunk in cursor.chunks(chunk_size):
+            ids, timestamps, vendors, categories, cents, notes = zip(*chunk)
+            batch = pa.record_batch([
+                pa.array(ids, type=pa.int64()),
+                pa.array(timestamps, type=pa.timestamp('us')),
+                pa.array(vendors, type=pa.string()),
+                pa.array(categories, type=pa.string()),
+                pa.array([cents_to_decimal(c) for c in cents], type=pa.decimal128(12, 2)),
+                pa.array(notes, type=pa.string()),
+            ], schema=schema)
+            writer.write_batch(batch)
+            rows_written += len(chunk)
+            if progress:
+                progress(rows_written)
+    return rows_written
+
+def export_transactions(path, fmt='csv', month_name=None, compression=None,
+                        chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """
+    Streams transactions (all, or one 'YYYY-MM' month) to a CSV or Parquet file.
+    Rows are fetched and written chunk_size at a time, so memory stays flat however
+    many rows there are. compression: 'gzip' for CSV; 'snappy', 'zstd', 'gzip' or None for Parquet.
+    progress, if given, is called with the running row count after every chunk.
+    Returns the number of rows written.
+    """
+    if fmt not in FORMATS:
+        raise Exception(f"Unknown export format '{fmt}'")
+    write = _write_parquet if fmt == 'parquet' else _write_csv
+    with db_client.stream_transactions(month_name) as cursor:
+        return write(cursor, path, chunk_size, compression, progress)
+
+class ExportJob:
+    """An export running on the exporter thread pool, written to a temporary file."""
+
+    def __init__(self, fmt, month_name=None, compression=None):
+        self.fmt = fmt
+        self.month_name = month_name
+        self.compression = compression
+        self.rows_written = 0
+        fd, self.path = tempfile.mkstemp(prefix=EXPORT_PREFIX, suffix=file_extension(fmt, compression))
+        os.close(fd)
+        self._lock = threading.Lock()
+        self._future = _executor.submit(self._run)
+
+    def _progress(self, rows):
+        with self._lock:
+            self.rows_written = rows
+
+    def _run(self):
+        try:
+            return export_transactions(self.path, self.fmt, self.month_name, self.compression, progress=self._progress)
+        except Exception:
+            # Nothing to download; don't leave a partial file behind
+            self._remove_file()
+            raise
+
+    def _remove_file(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    @property
+    def file_name(self):
+        return f"transactions-{self.month_name or 'all'}{file_extension(self.fmt, self.compression)}"
+
+    def done(self):
+        return self._future.done()
+
+    def error(self):
+        """The exception the export failed with, or None (also None while running)."""
+        return self._future.exception() if self._future.done() else None
+
+    def discard(self):
+        """Deletes the export file once the job has finished (after its download, or when replaced)."""
+        if self._future.done():
+            self._remove_file()
+
+def remove_stale_exports(max_age=STALE_EXPORT_SECONDS):
+    """Deletes export files left in the temp directory for more than max_age seconds. Returns how many."""
+    directory = tempfile.gettempdir()
+    cutoff = time.time() - max_age
+    removed = 0
+    for name in os.listdir(directory):
+        if not name.startswith(EXPORT_PREFIX):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            pass
+    return removed
+
+def start_export(fmt='csv', month_name=None, compression=None):
+    """Starts an export in the background and returns its ExportJob."""
+    remove_stale_exports()
+    return ExportJob(fmt, month_name, compression)
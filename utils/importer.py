@@ -0,0 +1,261 @@
+import csv
+import hashlib
+import io
+import re
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+import db_client
+
+DATE_FORMATS = ['%Y-%m-%d', '%m/%d/%Y', '%m/%d/%y', '%Y/%m/%d', '%d.%m.%Y', '%m-%d-%Y']
+
+# Header names seen in common bank exports, lowercased
+CSV_COLUMNS = {
+    'date': ['date', 'transaction date', 'trans. date', 'posted date', 'posting date'],
+    'amount': ['amount', 'transaction amount'],
+    'debit': ['debit', 'withdrawal', 'withdrawals'],
+    'credit': ['credit', 'deposit', 'deposits'],
+    'vendor': ['description', 'payee', 'merchant', 'name', 'vendor'],
+    'category': ['category'],
+    'notes': ['memo', 'notes', 'note'],
+}
+
+OFX_TAG = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+
+def detect_format(filename):
+    """'ofx' for .ofx/.qfx files, otherwise 'csv'."""
+    return 'ofx' if filename.lower().endswith(('.ofx', '.qfx')) else 'csv'
+
+def open_text(binary_stream):
+    """Wraps an uploaded/opened binary file so it can be read incrementally as text."""
+    return io.TextIOWrapper(binary_stream, encoding='utf-8-sig', errors='replace', newline='')
+
+def normalize_vendor(vendor):
+    """Uppercased vendor with store numbers and extra whitespace removed, for matching."""
+    vendor = re.sub(r'#\s*\d+|\b\d{3,}\b', ' ', (vendor or '').upper())
+    return ' '.join(vendor.split())
+
+def _parse_date(value):
+    value = (value or '').strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognized date '{value}'")
+
+def _parse_amount(value):
+    value = (value or '').strip().replace('$', '').replace(',', '')
+    if value.startswith('(') and value.endswith(')'):
+        value = '-' + value[1:-1]
+    if not value:
+        return None
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f"Unrecognized amount '{value}'")
+
+# ===== PARSERS =====
+# Each yields normalized rows: {'date', 'amount', 'vendor', 'notes', 'category', 'fitid'}
+# where amount is positive for money spent and zero/negative for credits,
+# or {'error': message} for a row that could not be read.
+
+def read_csv(text_stream, positive_expenses=False):
+    """
+    Streams rows from a bank CSV export.
+    Single 'Amount' columns are read as negative = spent, unless positive_expenses is set
+    (card exports that list charges as positive numbers). Debit/Credit column pairs are
+    detected automatically.
+    """
+    reader = csv.DictReader(text_stream)
+    headers = {(h or '').strip().lower(): h for h in (reader.fieldnames or [])}
+    columns = {}
+    for field, names in CSV_COLUMNS.items():
+        for name in names:
+            if name in headers:
+                columns[field] = headers[name]
+                break
+
+    if 'date' not in columns or 'vendor' not in columns or not ('amount' in columns or 'debit' in columns):
+        yield {'error': f"CSV needs date, description and amount (or debit) columns; found {list(headers)}"}
+        return
+
+    for line_no, record in enumerate(reader, start=2):
+        try:
+            if 'amount' in columns:
+                amount = _parse_amount(record.get(columns['amount']))
+                if amount is None:
+                    raise ValueError("Missing amount")
+                amount = amount if positive_expenses else -amount
+            else:
+                debit = _parse_amount(record.get(columns['debit'])) or Decimal(0)
+                credit = _parse_amount(record.get(columns.get('credit'))) if 'credit' in columns else None
+                amount = abs(debit) - abs(credit or 0)
+            yield {
+                'date': _parse_date(record.get(columns['date'])),
+                'amount': amount,
+                'vendor': (record.get(columns['vendor']) or '').strip(),
+                'notes': (record.get(columns['notes']) or '').strip() if 'notes' in columns else '',
+                'category': (record.get(columns['category']) or '').strip() if 'category' in columns else '',
+                'fitid': None,
+            }
+        except ValueError as e:
+            yield {'error': f"Line {line_no}: {e}"}
+
+def _ofx_row(fields):
+    try:
+        posted = fields.get('DTPOSTED', '')
+        date = datetime.strptime(posted[:14], '%Y%m%d%H%M%S') if len(posted) >= 14 else datetime.strptime(posted[:8], '%Y%m%d')
+        amount = _parse_amount(fields.get('TRNAMT'))
+        if amount is None:
+            raise ValueError("Missing TRNAMT")
+        return {
+            'date': date,
+            'amount': -amount,  # OFX debits are negative
+            'vendor': fields.get('NAME') or fields.get('PAYEE') or fields.get('MEMO', ''),
+            'notes': fields.get('MEMO', '') if fields.get('NAME') else '',
+            'category': '',
+            'fitid': fields.get('FITID'),
+        }
+    except ValueError as e:
+        return {'error': f"Transaction {fields.get('FITID', '?')}: {e}"}
+
+def read_ofx(text_stream, block_size=65536):
+    """
+    Streams <STMTTRN> records from an OFX/QFX file (SGML 1.x or XML 2.x)
+    without loading the whole file.
+    """
+    buffer = ''
+    current = None
+    while True:
+        block = text_stream.read(block_size)
+        buffer += block
+        # Only parse up to the last '<' so no tag value is cut in half
+        cut = len(buffer) if not block else buffer.rfind('<')
+        if cut <= 0:
+            if not block:
+                break
+            continue
+        text, buffer = buffer[:cut], buffer[cut:]
+        for closing, tag, value in OFX_TAG.findall(text):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                if closing and current is not None:
+                    yield _ofx_row(current)
+                    current = None
+                elif not closing:
+                    current = {}
+            elif current is not None and not closing and value.strip():
+                current[tag] = value.strip()
+        if not block:
+            break
+
+# ===== CATEGORY MAPPING =====
+
+class CategoryMapper:
+    """
+    Picks a budget category for an imported row, in order of preference:
+    the file's own category column (if it names a known category), a
+    categorization_rules match, the category this vendor was filed under
+    most often before, and finally the default category.
+    """
+
+    def __init__(self, category_names, default_category):
+        self.by_lower = {name.lower(): name for name in category_names}
+        self.default_category = default_category
+        self.rules = [
+            ((r.get('vendor_pattern') or '').upper(), (r.get('keyword_pattern') or '').upper(), r['category'])
+            for r in db_client.get_categorization_rules()
+        ]
+        self.history = {}
+        for vendor, category in db_client.get_vendor_categories().items():
+            self.history.setdefault(normalize_vendor(vendor), category)
+
+    def category_for(self, row, vendor_key):
+        named = self.by_lower.get((row.get('category') or '').lower())
+        if named:
+            return named
+        text = f"{vendor_key} {(row.get('notes') or '').upper()}"
+        for vendor_pattern, keyword_pattern, category in self.rules:
+            if vendor_pattern and vendor_pattern in vendor_key:
+                return category
+            if keyword_pattern and keyword_pattern in text:
+                return category
+        return self.history.get(vendor_key, self.default_category)
+
+# ===== PIPELINE =====
+
+def dedup_key(row, vendor_key, occurrence):
+    """
+    Content hash identifying a statement line across re-imports.
+    OFX lines use the bank's FITID; CSV lines use their content plus how many
+    identical lines came before it in the file, so two same-day coffees both survive.
+    """
+    cents = int(row['amount'] * 100)
+    if row.get('fitid'):
+        basis = f"{db_client.DEFAULT_USER_ID}|ofx|{row['fitid']}|{row['date']:%Y-%m-%d}|{cents}"
+    else:
+        basis = f"{db_client.DEFAULT_USER_ID}|{row['date']:%Y-%m-%d}|{cents}|{vendor_key}|{occurrence}"
+    return hashlib.sha256(basis.encode('utf-8')).hexdigest()
+
+def import_transactions(text_stream, fmt='csv', default_category=None, chunk_size=500,
+                        positive_expenses=False, progress=None):
+    """
+    Streams a CSV or OFX/QFX statement into the transactions table.
+
+    Rows are parsed lazily, categorized, hashed and inserted chunk_size at a time,
+    each chunk in one database transaction that skips lines imported before.
+    progress, if given, is called with the running stats after every chunk.
+    Returns stats: read, inserted, duplicates, skipped (credits), errors, error_messages.
+    """
+    categories = [c['name'] for c in db_client.get_categories()]
+    if not categories:
+        raise Exception("No categories found; add a category before importing")
+    if default_category not in categories:
+        default_category = 'Miscellaneous' if 'Miscellaneous' in categories else categories[0]
+    mapper = CategoryMapper(categories, default_category)
+
+    rows = read_ofx(text_stream) if fmt == 'ofx' else read_csv(text_stream, positive_expenses)
+    stats = {'read': 0, 'inserted': 0, 'duplicates': 0, 'skipped': 0, 'errors': 0, 'error_messages': []}
+    occurrences = {}
+
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+
+        batch = []
+        for row in chunk:
+            stats['read'] += 1
+            if 'error' in row:
+                stats['errors'] += 1
+                if len(stats['error_messages']) < 20:
+                    stats['error_messages'].append(row['error'])
+                continue
+            if row['amount'] <= 0:
+                # Payments, refunds and deposits aren't expenses
+                stats['skipped'] += 1
+                continue
+
+            vendor_key = normalize_vendor(row['vendor'])
+            base = (row['date'].date(), row['amount'], vendor_key)
+            occurrence = occurrences.get(base, 0)
+            occurrences[base] = occurrence + 1
+            batch.append({
+                'category': mapper.category_for(row, vendor_key),
+                'amount': row['amount'],
+                'vendor': row['vendor'][:255],
+                'notes': row['notes'][:1000],
+                'date': row['date'],
+                'dedup_key': dedup_key(row, vendor_key, occurrence),
+            })
+
+        if batch:
+            inserted = db_client.add_transactions(batch, skip_duplicates=True)
+            stats['inserted'] += inserted
+            stats['duplicates'] += len(batch) - inserted
+        if progress:
+            progress(dict(stats))
+
+    return stats
@@ -0,0 +1,112 @@
+"""
+Exact money handling: amounts are carried as integer cents (int64 arrays for
+columns) and only turned into Decimal for the database or float for display.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+
+CENT = Decimal("0.01")
+
+def to_cents(value):
+    """
+    Integer cents for a Decimal, string, int or float amount, rounded half-up.
+    Floats go through str() first so 0.1 + 0.2 style noise never leaks in.
+    """
+    if value is None or value == '':
+        return 0
+    if isinstance(value, (int, np.integer)) and not isinstance(value, bool):
+        return int(value) * 100
+    return int(Decimal(str(value)).quantize(CENT, rounding=ROUND_HALF_UP) * 100)
+
+def cents_to_decimal(cents):
+    """Decimal dollars, exactly as DECIMAL(10, 2) stores them."""
+    return Decimal(int(cents)).scaleb(-2)
+
+def format_cents(cents):
+    """'1234.56' / '-2.50' without float rounding."""
+    cents = int(cents)
+    sign = '-' if cents < 0 else ''
+    cents = abs(cents)
+    return f"{sign}{cents // 100}.{cents % 100:02d}"
+
+def allocate(total_cents, weights):
+    """
+    Splits total_cents across weights in proportion, returning integer cents that
+    add up to exactly total_cents (largest-remainder method).
+    Leftover cents go to the largest fractional shares, ties to the earliest entry,
+    so the same inputs always give the same split. All-zero weights split evenly.
+    """
+    total_cents = int(total_cents)
+    weights = [max(int(w), 0) for w in weights]
+    if not weights:
+        return []
+    if not any(weights):
+        weights = [1] * len(weights)
+    sign = -1 if total_cents < 0 else 1
+    total = abs(total_cents)
+    weight_sum = sum(weights)
+
+    shares = []
+    remainders = []
+    for i, weight in enumerate(weights):
+        share, remainder = divmod(total * weight, weight_sum)
+        shares.append(share)
+        remainders.append((-remainder, i))
+    for _, i in sorted(remainders)[:total - sum(shares)]:
+        shares[i] += 1
+    return [sign * share for share in shares]
+
+class MoneyArray:
+    """
+    A column of amounts as an int64 array of cents.
+    Totals and per-group sums are exact integer NumPy reductions; convert to
+    float dollars only at the edge, for charts and display.
+    """
+
+    __slots__ = ("cents",)
+
+    def __init__(self, cents):
+        self.cents = np.asarray(cents, dtype=np.int64)
+
+    @classmethod
+    def from_amounts(cls, amounts):
+        """From Decimal / str / float amounts (rounded half-up to the cent)."""
+        if isinstance(amounts, np.ndarray) and amounts.dtype.kind == 'f':
+            return cls(np.rint(amounts * 100))
+        return cls(np.fromiter((to_cents(a) for a in amounts), dtype=np.int64))
+
+    def __len__(self):
+        return len(self.cents)
+
+    def total(self):
+        """Exact sum in cents, as a Python int."""
+        return int(self.cents.sum(dtype=np.int64))
+
+    def group_totals(self, keys):
+        """
+        Exact sum of cents per key, as {key: int cents}, in first-seen key order.
+        Uses one stable sort and np.add.reduceat, so it stays vectorized.
+        """
+        keys = np.asarray(keys, dtype=object)
+        if not len(keys):
+            return {}
+        codes, uniques = _factorize(keys)
+        order = np.argsort(codes, kind='stable')
+        sorted_codes = codes[order]
+        starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+        sums = np.add.reduceat(self.cents[order], starts)
+        return {uniques[code]: int(total) for code, total in zip(sorted_codes[starts], sums)}
+
+    def dollars(self):
+        """Float dollars for display and charting (never for arithmetic)."""
+        return self.cents / 100.0
+
+    def allocate(self, total_cents):
+        """A new MoneyArray summing to exactly total_cents, split in proportion to these amounts."""
+        return MoneyArray(allocate(total_cents, self.cents.tolist()))
+
+def _factorize(keys):
+    index = {}
+    codes = np.fromiter((index.setdefault(k, len(index)) for k in keys), dtype=np.int64, count=len(keys))
+    return codes, list(index)
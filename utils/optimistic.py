@@ -0,0 +1,126 @@
+"""
+Optimistic writes for the UI.
+
+A save or delete is shown right away: the change is folded into the
+dashboard data (data_loader.fold_rows) while the database write runs on a
+background thread. When the write lands, the data version it bumps brings in
+the real rows; if it fails, the change simply stops being folded in (the UI
+rolls back) and the error is reported on the next render.
+"""
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import db_client
+from utils import write_behind
+from utils.money import to_cents
+
+# Shared by every session; writes are short, so a couple of threads is plenty
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="optimistic")
+
+_ids = itertools.count(1)
+
+def pending_row(transaction, now=None):
+    """An add_transactions dict shaped like a get_transactions record, with 'id' None and 'pending' True."""
+    timestamp = transaction.get('date') or now or datetime.now()
+    return {
+        'id': None,
+        'timestamp': timestamp,
+        'date': timestamp.strftime('%Y-%m-%d'),
+        'vendor': transaction['vendor'],
+        'category': transaction['category'],
+        'amount': to_cents(transaction['amount']) / 100,
+        'amount_cents': to_cents(transaction['amount']),
+        'notes': transaction.get('notes') or '',
+        'pending': True,
+        'failed': False,
+    }
+
+class PendingWrite:
+    __slots__ = ('id', 'description', 'added', 'removed', 'future')
+
+    def __init__(self, description, added, removed, future):
+        self.id = next(_ids)
+        self.description = description
+        self.added = added
+        self.removed = removed
+        self.future = future
+
+class WriteTracker:
+    """
+    One session's writes that have been shown but not yet confirmed.
+    Keep it in st.session_state; `version` goes up whenever the set of
+    in-flight writes changes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._writes = []
+        self.version = 0
+
+    def _submit(self, description, added, removed, fn, *args):
+        write = PendingWrite(description, added, removed, _executor.submit(fn, *args))
+        with self._lock:
+            self._writes.append(write)
+            self.version += 1
+        return write
+
+    def add(self, transactions, description):
+        """
+        Saves transactions (add_transactions dicts) in the background.
+        In write-behind mode they are journaled instead, which is already
+        immediate and shown from the journal, so nothing is tracked here.
+        """
+        if write_behind.enabled():
+            write_behind.get_queue().submit(transactions)
+            return None
+        now = datetime.now()
+        added = [pending_row(t, now) for t in transactions]
+        return self._submit(description, added, [], db_client.add_transactions, transactions)
+
+    def delete(self, rows, description):
+        """Deletes transaction rows (get_transactions records) in the background, in one bulk delete."""
+        rows = list(rows)
+        return self._submit(description, [], rows, db_client.delete_transactions, [row['id'] for row in rows])
+
+    def overlay(self):
+        """
+        (added rows, removed rows) of writes still in flight.
+        Finished writes are left out even before settle(): their effect is
+        already in the database (or, if they failed, should not be shown).
+        """
+        added, removed = [], []
+        with self._lock:
+            for write in self._writes:
+                if not write.future.done():
+                    added.extend(write.added)
+                    removed.extend(write.removed)
+        return added, removed
+
+    def in_flight(self):
+        with self._lock:
+            return any(not write.future.done() for write in self._writes)
+
+    def settle(self):
+        """Forgets finished writes. Returns [(description, error message)] for the ones that failed."""
+        failures = []
+        with self._lock:
+            remaining = []
+            for write in self._writes:
+                if not write.future.done():
+                    remaining.append(write)
+                    continue
+                error = write.future.exception()
+                if error is not None:
+                    failures.append((write.description, str(error)))
+            if len(remaining) != len(self._writes):
+                self._writes = remaining
+                self.version += 1
+        return failures
+
+def get_tracker(session_state):
+    """The session's WriteTracker, created on first use."""
+    if 'optimistic_writes' not in session_state:
+        session_state['optimistic_writes'] = WriteTracker()
+    return session_state['optimistic_writes']
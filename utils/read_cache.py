@@ -0,0 +1,106 @@
+"""
+Versioned, in-process cache for db_client reads.
+
+Keys carry the user, the month and the data versions the read depends on
+(db_client.get_data_version for the month's transactions,
+db_client.get_categories_version for anything showing category names or
+planned amounts). Writes bump only the versions they touch, so after a save
+in March only March's entries miss; other months and other readers stay warm.
+Superseded entries are never looked up again and fall out of the LRU.
+
+Writes made by other processes are not seen through versions; entries also
+expire after READ_CACHE_TTL seconds to bound that staleness.
+
+Results are shared between sessions: treat them as read-only.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import db_client
+
+class ReadCache:
+    """LRU of loaded results with a TTL. Empty results are not kept."""
+
+    def __init__(self, max_entries=256, ttl=300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (loaded_at, value)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, loader, keep=bool):
+        """
+        Returns the cached value for key, or loader() (kept if keep(value) is true).
+        Empty results are cheap to recompute, and a read that failed comes back
+        empty, so by default they are not cached.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = loader()
+        if keep(value):
+            with self._lock:
+                self._entries[key] = (now, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+_cache = ReadCache(
+    max_entries=int(db_client.get_setting("READ_CACHE_SIZE", 256)),
+    ttl=float(db_client.get_setting("READ_CACHE_TTL", 300)),
+)
+
+def _key(read, month_name, categories, *args):
+    # Version numbers are read before loading: a write that lands mid-load
+    # bumps them, so the result is stored under a key nobody asks for again
+    user_id = db_client.DEFAULT_USER_ID
+    return (
+        read,
+        user_id,
+        month_name,
+        db_client.get_data_version(month_name, user_id),
+        db_client.get_categories_version() if categories else None,
+    ) + args
+
+def get_month_summary(month_name=None):
+    return _cache.get(
+        _key('summary', month_name, True),
+        lambda: db_client.get_month_summary(month_name),
+        keep=lambda summary: summary['count'] > 0,
+    )
+
+def get_category_totals(month_name=None):
+    return _cache.get(_key('category_totals', month_name, True), lambda: db_client.get_category_totals(month_name))
+
+def get_daily_totals(month_name=None):
+    return _cache.get(_key('daily_totals', month_name, False), lambda: db_client.get_daily_totals(month_name))
+
+def get_transactions(month_name=None):
+    return _cache.get(_key('transactions', month_name, True), lambda: db_client.get_transactions(month_name))
+
+def get_available_months():
+    return _cache.get(_key('available_months', None, False), db_client.get_available_months)
+
+def clear():
+    """Drops every cached read (the Settings page's Clear Cache button)."""
+    _cache.clear()
+
+def stats():
+    return _cache.stats()
@@ -2,11 +2,7 @@ import os
 import base64
 import json
 from io import BytesIO
-from PIL import Image
-import streamlit as st
-from dotenv import load_dotenv
-
-load_dotenv()
+from utils.money import MoneyArray, to_cents
 
 def parse_receipt_image(image_bytes, categories):
     """
@@ -23,9 +19,12 @@ def parse_receipt_image(image_bytes, categories):
     try:
         # Get credentials
         try:
+            import streamlit as st
             api_key = st.secrets.get("WATSONX_API_KEY")
             project_id = st.secrets.get("WATSONX_PROJECT_ID")
         except:
+            from dotenv import load_dotenv
+            load_dotenv()
             api_key = os.environ.get("WATSONX_API_KEY")
             project_id = os.environ.get("WATSONX_PROJECT_ID")
         
@@ -39,7 +38,8 @@ def parse_receipt_image(image_bytes, categories):
         except ImportError:
             pass  # HEIF support not available
         
-        # Process image
+        # Process image (PIL is only loaded once a receipt is scanned)
+        from PIL import Image
         image = Image.open(BytesIO(image_bytes))
         
         # Resize if too large (vision models have size limits)
@@ -229,38 +229,38 @@ Return the JSON object now:"""
         tax = parsed_data.get('tax', 0)
         receipt_total = parsed_data.get('total', 0)
         
-        # Group items by category and sum amounts
+        # Group items by category; all sums are in integer cents so they never drift
+        item_cents = MoneyArray.from_amounts(item.get('amount', 0) for item in items)
+        item_categories = [item.get('category', 'Misc.') for item in items]
         category_totals = {}
-        for item in items:
-            category = item.get('category', 'Misc.')
-            amount = float(item.get('amount', 0))
-            
+        for item, category, cents in zip(items, item_categories, item_cents.cents.tolist()):
             if category not in category_totals:
                 category_totals[category] = {
                     'category': category,
                     'amount': 0,
+                    'amount_cents': 0,
                     'items': []
                 }
-            
-            category_totals[category]['amount'] += amount
             category_totals[category]['items'].append({
                 'description': item.get('description', 'Unknown'),
-                'amount': amount
+                'amount': cents / 100,
+                'amount_cents': cents
             })
+        for category, cents in item_cents.group_totals(item_categories).items():
+            category_totals[category]['amount_cents'] = cents
+            category_totals[category]['amount'] = cents / 100
         
-        # Apply discounts to the appropriate categories or create a separate entry
-        total_discounts = 0
-        for discount in discounts:
-            discount_amount = float(discount.get('amount', 0))
-            total_discounts += discount_amount
+        # Discounts are kept as their own line (negative amounts)
+        total_discounts_cents = MoneyArray.from_amounts(d.get('amount', 0) for d in discounts).total()
+        tax_cents = to_cents(tax)
+        receipt_total_cents = to_cents(receipt_total)
         
         # Calculate our total: sum of categories + discounts + tax
-        calculated_subtotal = sum(cat['amount'] for cat in category_totals.values())
-        calculated_total = calculated_subtotal + total_discounts + tax
+        calculated_total_cents = item_cents.total() + total_discounts_cents + tax_cents
         
         # Validate total (allow 1% tolerance for rounding)
-        total_diff = abs(calculated_total - receipt_total) if receipt_total > 0 else 0
-        total_valid = total_diff < (receipt_total * 0.01) if receipt_total > 0 else True
+        total_diff_cents = abs(calculated_total_cents - receipt_total_cents) if receipt_total_cents > 0 else 0
+        total_valid = total_diff_cents * 100 < receipt_total_cents if receipt_total_cents > 0 else True
         
         # Convert category_totals to list
         grouped_items = list(category_totals.values())
@@ -268,12 +268,17 @@ Return the JSON object now:"""
         return {
             "grouped_items": grouped_items,
             "discounts": discounts,
-            "total_discounts": total_discounts,
-            "tax": tax,
-            "receipt_total": receipt_total,
-            "calculated_total": calculated_total,
+            "total_discounts": total_discounts_cents / 100,
+            "total_discounts_cents": total_discounts_cents,
+            "tax": tax_cents / 100,
+            "tax_cents": tax_cents,
+            "receipt_total": receipt_total_cents / 100,
+            "receipt_total_cents": receipt_total_cents,
+            "calculated_total": calculated_total_cents / 100,
+            "calculated_total_cents": calculated_total_cents,
             "total_valid": total_valid,
-            "total_diff": total_diff,
+            "total_diff": total_diff_cents / 100,
+            "total_diff_cents": total_diff_cents,
             "raw": response
         }
         
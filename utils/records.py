@@ -0,0 +1,144 @@
+"""
+Compact row types returned by db_client.
+
+Rows are slotted objects rather than dicts: a few pointers each instead of a
+hash table, with no per-row copy of the key names. They still answer
+row['amount'] and row.get('vendor') so older dict-style callers keep working,
+and convert to columns (to_frame) in one pass per field.
+Treat them as read-only; the category directory hands out shared instances.
+"""
+from operator import attrgetter
+
+from utils.money import to_cents
+
+class Record:
+    __slots__ = ()
+
+    # Read-only attributes that dict-style access also answers (on top of __slots__)
+    _derived = ()
+
+    def __getitem__(self, key):
+        if key in self.__slots__ or key in self._derived:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return self.__slots__ + self._derived
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in self.keys()}
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, f) == getattr(other, f) for f in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self):
+        fields = ", ".join(f"{f}={getattr(self, f)!r}" for f in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+    def __getstate__(self):
+        return tuple(getattr(self, f) for f in self.__slots__)
+
+    def __setstate__(self, state):
+        for field, value in zip(self.__slots__, state):
+            setattr(self, field, value)
+
+    @classmethod
+    def columns(cls, records):
+        """{field: list of values} for every slot, one pass per field."""
+        return {f: list(map(attrgetter(f), records)) for f in cls.__slots__}
+
+class Transaction(Record):
+    """
+    One transaction. amount_cents is exact; amount (float dollars) and date
+    ('YYYY-MM-DD') are derived on access. row is the old alias of id.
+    """
+
+    __slots__ = ('id', 'timestamp', 'vendor', 'category', 'amount_cents', 'notes')
+    _derived = ('amount', 'date', 'row')
+
+    def __init__(self, id, timestamp, vendor, category, amount_cents, notes):
+        self.id = id
+        self.timestamp = timestamp
+        self.vendor = vendor
+        self.category = category
+        self.amount_cents = amount_cents
+        self.notes = notes
+
+    @classmethod
+    def from_row(cls, row_id, timestamp, vendor, category, amount, notes):
+        """From a (id, timestamp, vendor, category, amount, notes) row with a DECIMAL amount."""
+        return cls(row_id, timestamp, vendor, category, to_cents(amount), notes)
+
+    @property
+    def amount(self):
+        return self.amount_cents / 100
+
+    @property
+    def date(self):
+        timestamp = self.timestamp
+        return timestamp.strftime('%Y-%m-%d') if hasattr(timestamp, 'strftime') else str(timestamp)[:10]
+
+    @property
+    def row(self):
+        return self.id
+
+    @classmethod
+    def to_frame(cls, records):
+        """
+        Columnar form, same columns and dtypes as db_client.get_transactions_frame:
+        id (int64), timestamp (datetime64), vendor / category (category dtype),
+        amount_cents (int64), amount (float), notes.
+        """
+        import numpy as np
+        import pandas as pd
+
+        columns = cls.columns(records)
+        amount_cents = np.fromiter(columns['amount_cents'], dtype=np.int64, count=len(records))
+        return pd.DataFrame({
+            'id': np.fromiter(columns['id'], dtype=np.int64, count=len(records)),
+            'timestamp': np.asarray(pd.to_datetime(columns['timestamp']), dtype='datetime64[ns]'),
+            'vendor': pd.Categorical(columns['vendor']),
+            'category': pd.Categorical(columns['category']),
+            'amount_cents': amount_cents,
+            'amount': amount_cents / 100.0,
+            'notes': np.array(columns['notes'], dtype=object),
+        })
+
+class Category(Record):
+    """One budget category. planned_amount is the stored Decimal; planned_cents is exact."""
+
+    __slots__ = ('id', 'name', 'planned_amount')
+    _derived = ('planned_cents',)
+
+    def __init__(self, id, name, planned_amount):
+        self.id = id
+        self.name = name
+        self.planned_amount = planned_amount
+
+    @property
+    def planned_cents(self):
+        return to_cents(self.planned_amount)
+
+    @classmethod
+    def to_frame(cls, records):
+        """Columnar form: id, name, planned_amount (float dollars), planned_cents (int64)."""
+        import numpy as np
+        import pandas as pd
+
+        planned_cents = np.fromiter((r.planned_cents for r in records), dtype=np.int64, count=len(records))
+        return pd.DataFrame({
+            'id': np.fromiter((r.id for r in records), dtype=np.int64, count=len(records)),
+            'name': [r.name for r in records],
+            'planned_amount': planned_cents / 100.0,
+            'planned_cents': planned_cents,
+        })
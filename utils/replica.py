@@ -0,0 +1,268 @@
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from decimal import Decimal
+
+import db_client
+from utils.money import to_cents
+from utils.records import Category, Transaction
+
+REPLICA_SCHEMA = """
+CREATE TABLE IF NOT EXISTS categories (
+    id INTEGER PRIMARY KEY,
+    name TEXT,
+    planned_amount TEXT
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    category_id INTEGER,
+    amount TEXT,
+    vendor TEXT,
+    notes TEXT,
+    timestamp TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_replica_user_ts ON transactions (user_id, timestamp);
+CREATE TABLE IF NOT EXISTS sync_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+SYNC_CHUNK_SIZE = 1000
+
+def _text(value):
+    """Amounts and timestamps are stored as text so they round-trip exactly and sort correctly."""
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+class Replica:
+    """
+    Local SQLite copy of categories and the user's transactions.
+
+    sync() pulls only rows stamped with a change_seq above the replica's
+    high-water mark, plus tombstones for deletes. Reads are served only while
+    the last successful sync is within max_staleness seconds and the replica has
+    caught up with every write this process made; otherwise the caller falls
+    back to the primary database.
+    """
+
+    def __init__(self, path, max_staleness=30.0, sync_interval=10.0):
+        self.path = path
+        self.max_staleness = max_staleness
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()        # guards the local connection
+        self._sync_lock = threading.Lock()   # one sync at a time
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(REPLICA_SCHEMA)
+        row = self._conn.execute("SELECT value FROM sync_meta WHERE key = 'hwm'").fetchone()
+        self.hwm = int(row[0]) if row else None
+        self.synced_at = None                # monotonic time of the last successful sync
+        self.last_error = None
+        self.syncs = 0
+        self._stopped = threading.Event()
+        self._thread = None
+
+    # --- sync ---
+
+    def _pull(self, conn, sql, params):
+        rows = []
+        with db_client.iter_query(conn, sql, params) as cursor:
+            for chunk in cursor.chunks(SYNC_CHUNK_SIZE):
+                rows.extend(tuple(_text(value) for value in row) for row in chunk)
+        return rows
+
+    def sync(self):
+        """
+        Brings the replica up to date with the primary. The first sync (or one after
+        the primary was reset, or after tombstones it needs were pruned) copies
+        everything; later ones copy only changes.
+        Returns the number of rows applied.
+        """
+        categories_changed = False
+        with self._sync_lock:
+            with db_client.pooled_connection() as conn:
+                if not conn:
+                    raise Exception("Database connection failed")
+                # Read the target first: everything at or below it is already committed
+                target = db_client.get_change_seq(conn)
+                full = self.hwm is None or target < self.hwm
+                if not full and target == self.hwm:
+                    self._mark_synced()
+                    return 0
+                # Tombstones we still need were pruned: copy everything instead
+                if not full and self.hwm + 1 < db_client.get_tombstone_floor(conn):
+                    full = True
+
+                since = [] if full else [self.hwm]
+                seq_filter = "" if full else " AND change_seq > ?"
+                categories = self._pull(
+                    conn,
+                    f"SELECT id, name, planned_amount FROM categories WHERE 1 = 1{seq_filter}",
+                    since,
+                )
+                transactions = self._pull(
+                    conn,
+                    f"""
+                        SELECT id, user_id, category_id, amount, vendor, notes, timestamp
+                        FROM transactions WHERE user_id = ?{seq_filter}
+                    """,
+                    [db_client.DEFAULT_USER_ID] + since,
+                )
+                tombstones = [] if full else db_client.execute_query(
+                    conn, "SELECT table_name, row_id FROM tombstones WHERE change_seq > ?", since
+                )
+
+            with self._lock:
+                local = self._conn
+                local.execute("BEGIN IMMEDIATE")
+                try:
+                    if full:
+                        local.execute("DELETE FROM categories")
+                        local.execute("DELETE FROM transactions")
+                    local.executemany("INSERT OR REPLACE INTO categories VALUES (?, ?, ?)", categories)
+                    local.executemany("INSERT OR REPLACE INTO transactions VALUES (?, ?, ?, ?, ?, ?, ?)", transactions)
+                    for row in tombstones:
+                        if row['table_name'] in ('categories', 'transactions'):
+                            local.execute(f"DELETE FROM {row['table_name']} WHERE id = ?", (row['row_id'],))
+                    local.execute("INSERT OR REPLACE INTO sync_meta VALUES ('hwm', ?)", (str(target),))
+                    local.execute("COMMIT")
+                except Exception:
+                    local.execute("ROLLBACK")
+                    raise
+            self.hwm = target
+            self._mark_synced()
+            categories_changed = full or bool(categories) or any(r['table_name'] == 'categories' for r in tombstones)
+
+        if categories_changed:
+            # Outside the sync lock: the directory may be reloading from us
+            db_client.category_directory.invalidate()
+        return len(categories) + len(transactions) + len(tombstones)
+
+    def _mark_synced(self):
+        self.synced_at = time.monotonic()
+        self.last_error = None
+        self.syncs += 1
+
+    def is_fresh(self):
+        return (
+            self.synced_at is not None
+            and time.monotonic() - self.synced_at <= self.max_staleness
+            and db_client.get_local_change_seq() <= (self.hwm or 0)
+        )
+
+    def ensure_fresh(self):
+        """Syncs now if the replica is past its staleness bound. Returns whether it may serve reads."""
+        if self.is_fresh():
+            return True
+        try:
+            self.sync()
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Read replica sync failed: {e}")
+            return False
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="replica-sync", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _loop(self):
+        while not self._stopped.wait(self.sync_interval):
+            try:
+                self.sync()
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Read replica sync failed: {e}")
+
+    # --- reads (same shapes as the db_client functions they stand in for) ---
+
+    def get_categories(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT id, name, planned_amount FROM categories ORDER BY name").fetchall()
+        return [
+            Category(row_id, name, Decimal(planned) if planned is not None else None)
+            for row_id, name, planned in rows
+        ]
+
+    def get_transactions(self, month_name=None):
+        sql = """
+            SELECT t.id, t.timestamp, t.vendor, c.name, t.amount, t.notes
+            FROM transactions t
+            JOIN categories c ON t.category_id = c.id
+            WHERE t.user_id = ?
+        """
+        params = [db_client.DEFAULT_USER_ID]
+        if month_name:
+            month_start, month_end = db_client.month_bounds(month_name)
+            sql += " AND t.timestamp >= ? AND t.timestamp < ?"
+            params.extend([_text(month_start), _text(month_end)])
+        sql += " ORDER BY t.timestamp DESC"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            Transaction(row_id, datetime.fromisoformat(timestamp), vendor, category, to_cents(amount), notes)
+            for row_id, timestamp, vendor, category, amount, notes in rows
+        ]
+
+    def get_available_months(self):
+        sql = """
+            SELECT DISTINCT substr(timestamp, 1, 7) as month_str
+            FROM transactions
+            WHERE user_id = ?
+            ORDER BY month_str DESC
+        """
+        with self._lock:
+            rows = self._conn.execute(sql, (db_client.DEFAULT_USER_ID,)).fetchall()
+        return [month for (month,) in rows]
+
+    def stats(self):
+        return {
+            'hwm': self.hwm,
+            'age_seconds': time.monotonic() - self.synced_at if self.synced_at is not None else None,
+            'max_staleness': self.max_staleness,
+            'syncs': self.syncs,
+            'last_error': self.last_error,
+        }
+
+_replica = None
+_replica_lock = threading.Lock()
+_enabled = None
+
+def enabled():
+    """Whether reads may be served from the local replica (READ_REPLICA setting)."""
+    global _enabled
+    if _enabled is None:
+        _enabled = str(db_client.get_setting("READ_REPLICA", "false")).lower() in ("1", "true", "yes", "on")
+    return _enabled
+
+def get_replica():
+    """Returns the process-wide replica, starting its background sync on first use."""
+    global _replica
+    if _replica is None:
+        with _replica_lock:
+            if _replica is None:
+                replica = Replica(
+                    db_client.get_setting("REPLICA_PATH", "replica.db"),
+                    max_staleness=float(db_client.get_setting("REPLICA_MAX_STALENESS", 30)),
+                    sync_interval=float(db_client.get_setting("REPLICA_SYNC_INTERVAL", 10)),
+                )
+                replica.start()
+                _replica = replica
+    return _replica
+
+def fresh_replica():
+    """The replica if it is enabled and within its staleness bound (syncing first if needed), else None."""
+    if not enabled():
+        return None
+    replica = get_replica()
+    return replica if replica.ensure_fresh() else None
@@ -1,10 +1,4 @@
 import os
-from ibm_watson import SpeechToTextV1
-from ibm_cloud_sdk_core.authenticators import IAMAuthenticator
-import streamlit as st
-from dotenv import load_dotenv
-
-load_dotenv()
 
 def transcribe_audio(audio_bytes):
     """
@@ -20,16 +14,21 @@ def transcribe_audio(audio_bytes):
     try:
         # Get credentials
         try:
+            import streamlit as st
             api_key = st.secrets.get("SPEECH_TO_TEXT_API_KEY")
             url = st.secrets.get("SPEECH_TO_TEXT_URL", "https://api.us-south.speech-to-text.watson.cloud.ibm.com")
         except:
+            from dotenv import load_dotenv
+            load_dotenv()
             api_key = os.environ.get("SPEECH_TO_TEXT_API_KEY")
             url = os.environ.get("SPEECH_TO_TEXT_URL", "https://api.us-south.speech-to-text.watson.cloud.ibm.com")
         
         if not api_key:
             return {"error": "Missing Speech to Text API credentials"}
         
-        # Set up authenticator and service
+        # Set up authenticator and service (the Watson SDK is only loaded for voice input)
+        from ibm_watson import SpeechToTextV1
+        from ibm_cloud_sdk_core.authenticators import IAMAuthenticator
         authenticator = IAMAuthenticator(api_key)
         speech_to_text = SpeechToTextV1(authenticator=authenticator)
         speech_to_text.set_service_url(url)
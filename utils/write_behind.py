@@ -0,0 +1,310 @@
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+
+import db_client
+from utils.money import to_cents
+
+JOURNAL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pending_transactions (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    dedup_key TEXT NOT NULL UNIQUE,
+    category TEXT NOT NULL,
+    amount TEXT NOT NULL,
+    vendor TEXT,
+    notes TEXT,
+    timestamp TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    failed INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+# Idempotency keys are stored in transactions.dedup_key, so a batch that was
+# committed but not acknowledged is skipped (not duplicated) when it is retried
+KEY_PREFIX = "wb-"
+
+class Journal:
+    """
+    Durable local queue of saves that have not reached the database yet:
+    a SQLite file in WAL mode, fsynced on every append.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute(JOURNAL_SCHEMA)
+
+    def append(self, transactions):
+        """Journals transactions (dicts like add_transactions takes) and returns their keys."""
+        now = datetime.now()
+        rows = []
+        for t in transactions:
+            timestamp = t.get('date') or now
+            rows.append((
+                KEY_PREFIX + uuid.uuid4().hex,
+                t['category'],
+                str(Decimal(str(t['amount'])).quantize(db_client.CENT, rounding=ROUND_HALF_UP)),
+                t['vendor'],
+                t.get('notes') or '',
+                timestamp.isoformat(sep=' '),
+                now.isoformat(sep=' '),
+            ))
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany("""
+                    INSERT INTO pending_transactions (dedup_key, category, amount, vendor, notes, timestamp, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, rows)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [row[0] for row in rows]
+
+    def pending(self, limit=None, include_failed=False):
+        """Journaled transactions in save order, as add_transactions dicts (with 'dedup_key')."""
+        sql = "SELECT dedup_key, category, amount, vendor, notes, timestamp, attempts, last_error, failed FROM pending_transactions"
+        if not include_failed:
+            sql += " WHERE failed = 0"
+        sql += " ORDER BY seq"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            rows = self._conn.execute(sql).fetchall()
+        return [{
+            'dedup_key': key,
+            'category': category,
+            'amount': Decimal(amount),
+            'vendor': vendor,
+            'notes': notes,
+            'date': datetime.fromisoformat(timestamp),
+            'attempts': attempts,
+            'last_error': last_error,
+            'failed': bool(failed),
+        } for key, category, amount, vendor, notes, timestamp, attempts, last_error, failed in rows]
+
+    def remove(self, keys):
+        with self._lock:
+            self._conn.executemany("DELETE FROM pending_transactions WHERE dedup_key = ?", [(k,) for k in keys])
+
+    def record_failure(self, keys, error, max_attempts):
+        """Counts a failed attempt; entries that keep failing are parked instead of retried."""
+        with self._lock:
+            self._conn.executemany("""
+                UPDATE pending_transactions
+                SET attempts = attempts + 1, last_error = ?, failed = CASE WHEN attempts + 1 >= ? THEN 1 ELSE 0 END
+                WHERE dedup_key = ?
+            """, [(error, max_attempts, k) for k in keys])
+
+    def retry_failed(self):
+        with self._lock:
+            self._conn.execute("UPDATE pending_transactions SET failed = 0, attempts = 0 WHERE failed = 1")
+
+    def counts(self):
+        with self._lock:
+            pending, failed = self._conn.execute(
+                "SELECT COUNT(*) - COALESCE(SUM(failed), 0), COALESCE(SUM(failed), 0) FROM pending_transactions"
+            ).fetchone()
+        return {'pending': pending, 'failed': failed}
+
+class WriteBehindQueue:
+    """
+    Acknowledges saves as soon as they are journaled, and flushes them to the
+    database from a background thread in batches, retrying with exponential
+    backoff while the database is unreachable.
+    """
+
+    def __init__(self, journal, batch_size=100, flush_interval=2.0, max_backoff=60.0, max_attempts=10):
+        self.journal = journal
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+        # Goes up whenever the set of pending entries changes
+        self.version = 0
+        self.flushed = 0
+        self.last_error = None
+        self.last_flush_at = None
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="write-behind", daemon=True)
+            self._thread.start()
+            # Anything left over from a previous run goes out first
+            self._wake.set()
+
+    def stop(self, timeout=5.0):
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def submit(self, transactions):
+        """Journals transactions for saving and returns right away with their idempotency keys."""
+        known = {c['name'] for c in db_client.get_categories()}
+        for t in transactions:
+            # Reject what can never be saved now, rather than failing in the background
+            if known and t['category'] not in known:
+                raise Exception(f"Category '{t['category']}' not found")
+        keys = self.journal.append(transactions)
+        self.version += 1
+        self._wake.set()
+        return keys
+
+    def _loop(self):
+        backoff = 0.0
+        retry_at = 0.0
+        while not self._stopped.is_set():
+            self._wake.wait(max(retry_at - time.monotonic(), 0.0) or self.flush_interval)
+            self._wake.clear()
+            if self._stopped.is_set():
+                break
+            if time.monotonic() < retry_at:
+                # New saves during an outage wait for the backoff like everything else
+                continue
+            try:
+                self.flush()
+                backoff = 0.0
+            except Exception as e:
+                backoff = min(max(backoff * 2, 1.0), self.max_backoff)
+                retry_at = time.monotonic() + backoff
+                print(f"Write-behind flush failed, retrying in {backoff:.0f}s: {e}")
+
+    def _database_reachable(self):
+        try:
+            with db_client.pooled_connection(timeout=2) as conn:
+                return conn is not None
+        except Exception:
+            return False
+
+    def _save(self, entries):
+        db_client.add_transactions(entries, skip_duplicates=True)
+        self.journal.remove([e['dedup_key'] for e in entries])
+        self.flushed += len(entries)
+        self.version += 1
+
+    def flush(self):
+        """
+        Saves pending entries until the journal is empty. Returns how many were saved.
+        Raises if the database can't be reached, leaving the journal untouched.
+        """
+        total = 0
+        with self._flush_lock:
+            while True:
+                batch = self.journal.pending(self.batch_size)
+                if not batch:
+                    break
+                try:
+                    self._save(batch)
+                    total += len(batch)
+                    self.last_error = None
+                    continue
+                except Exception as e:
+                    self.last_error = str(e)
+                    if not self._database_reachable():
+                        raise
+
+                # The database is up, so something in this batch is bad:
+                # save entries one at a time and park the ones that keep failing
+                progressed = False
+                for entry in batch:
+                    try:
+                        self._save([entry])
+                        total += 1
+                        progressed = True
+                    except Exception as e:
+                        self.last_error = str(e)
+                        self.journal.record_failure([entry['dedup_key']], str(e), self.max_attempts)
+                if not progressed:
+                    raise Exception(self.last_error)
+        self.last_flush_at = datetime.now()
+        return total
+
+    def retry_failed(self):
+        """Puts parked entries back in line for the next flush."""
+        self.journal.retry_failed()
+        self.version += 1
+        self._wake.set()
+
+    def discard_failed(self):
+        """Drops parked entries from the journal for good. Returns how many were dropped."""
+        keys = [e['dedup_key'] for e in self.journal.pending(include_failed=True) if e['failed']]
+        self.journal.remove(keys)
+        self.version += 1
+        return len(keys)
+
+    def stats(self):
+        stats = self.journal.counts()
+        stats.update({
+            'flushed': self.flushed,
+            'last_error': self.last_error,
+            'last_flush_at': self.last_flush_at,
+        })
+        return stats
+
+_queue = None
+_queue_lock = threading.Lock()
+_enabled = None
+
+def enabled():
+    """Whether saves go through the write-behind journal (WRITE_BEHIND setting)."""
+    global _enabled
+    if _enabled is None:
+        _enabled = str(db_client.get_setting("WRITE_BEHIND", "false")).lower() in ("1", "true", "yes", "on")
+    return _enabled
+
+def get_queue():
+    """Returns the process-wide write-behind queue, starting its worker on first use."""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                queue = WriteBehindQueue(
+                    Journal(db_client.get_setting("WRITE_BEHIND_JOURNAL", "write_behind.db")),
+                    batch_size=int(db_client.get_setting("WRITE_BEHIND_BATCH_SIZE", 100)),
+                    flush_interval=float(db_client.get_setting("WRITE_BEHIND_FLUSH_INTERVAL", 2)),
+                )
+                queue.start()
+                _queue = queue
+    return _queue
+
+def pending_transactions(month_name=None):
+    """
+    Saves still waiting in the journal (including parked ones), newest first, shaped like
+    get_transactions records (as dicts) with 'id' None and 'pending' True. Empty when write-behind is off.
+    """
+    if not enabled():
+        return []
+    rows = []
+    for entry in get_queue().journal.pending(include_failed=True):
+        timestamp = entry['date']
+        if month_name and timestamp.strftime('%Y-%m') != month_name:
+            continue
+        rows.append({
+            'id': None,
+            'timestamp': timestamp,
+            'date': timestamp.strftime('%Y-%m-%d'),
+            'vendor': entry['vendor'],
+            'category': entry['category'],
+            'amount': float(entry['amount']),
+            'amount_cents': to_cents(entry['amount']),
+            'notes': entry['notes'],
+            'pending': True,
+            'failed': entry['failed'],
+            'dedup_key': entry['dedup_key'],
+        })
+    rows.sort(key=lambda r: r['timestamp'], reverse=True)
+    return rows